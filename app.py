@@ -1,19 +1,650 @@
 import os
-from flask import Flask, request, render_template, jsonify, redirect, url_for, session
+import atexit
+import bisect
+import csv
+import gc
+import itertools
+import json
+import multiprocessing
+import gzip
+import hashlib
+import hmac
+import mimetypes
+import queue
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque, namedtuple
+from collections.abc import Mapping
+from functools import lru_cache, partial, wraps
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime, timezone
+import click
+from flask import Flask, Blueprint, current_app, request, render_template, jsonify, redirect, url_for, session, abort, g, send_file, send_from_directory, make_response
+from flask import before_render_template, template_rendered, has_request_context
 from flask_sqlalchemy import SQLAlchemy
+from jinja2 import ChoiceLoader, DictLoader, FileSystemBytecodeCache
+from sqlalchemy import select, insert, delete, event, inspect, text, tuple_
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.utils import safe_join
 import logging
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+import numpy as np
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip variants are built
+    brotli = None
 
-# Create Flask app
-app = Flask(__name__)
-app.secret_key = 'your_secret_key'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///users.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it posters are served at full size
+    Image = None
 
-db = SQLAlchemy(app)
+try:
+    import fcntl
+except ImportError:  # not available on Windows; the audit log is then only safe for one process
+    fcntl = None
+
+# "name=value,name=value" -> {name: value}
+def parse_logger_settings(value, convert=str):
+    pairs = (item.split('=', 1) for item in value.split(',') if '=' in item)
+    return {name.strip(): convert(setting.strip()) for name, setting in pairs}
+
+# Routes, request hooks, template globals and CLI commands are registered on this
+# blueprint; create_app() builds the Flask app around it
+bp = Blueprint('main', __name__, cli_group=None)
+
+# Default configuration, mostly read from the environment. create_app(config) applies
+# its overrides on top.
+def load_config(app):
+    app.secret_key = 'your_secret_key'
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///users.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # SQLite connection profile, applied on every new connection. WAL lets readers run
+    # alongside a writer, and busy_timeout makes writers wait for the lock instead of failing.
+    app.config['SQLITE_PRAGMAS'] = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'cache_size': -int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024)),
+        'temp_store': 'MEMORY',
+    }
+    # Serve read-only queries (e.g. the watchlist page) from a separate pool of
+    # mode=ro connections so they never queue behind writers
+    app.config['SQLITE_READONLY_POOL'] = os.environ.get('SQLITE_READONLY_POOL') == '1'
+    # 'files' writes templates/*.html (only when their content changed); 'memory' serves
+    # the template strings below straight from a DictLoader without touching the disk
+    app.config['TEMPLATE_MODE'] = os.environ.get('TEMPLATE_MODE', 'files')
+    # Compiled templates are cached here so each worker doesn't recompile them on boot
+    app.config['TEMPLATE_BYTECODE_CACHE_DIR'] = os.environ.get(
+        'TEMPLATE_BYTECODE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'main-project-jinja'))
+    # Password hashing: werkzeug method string (cost parameters included), number of hashing
+    # processes (0 hashes inline on the request thread; see hashing_context() for what
+    # they need from the entry script), how many hashes may be waiting
+    # beyond the busy workers before requests get a 503, and how long a request waits
+    app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+    app.config['PASSWORD_HASH_QUEUE_SIZE'] = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE', 32))
+    app.config['PASSWORD_HASH_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5))
+    # Logged-in user lookups are cached per worker; the TTL bounds how stale another
+    # worker's change can be
+    app.config['USER_CACHE_SIZE'] = int(os.environ.get('USER_CACHE_SIZE', 10000))
+    app.config['USER_CACHE_TTL'] = float(os.environ.get('USER_CACHE_TTL', 60))
+    # Number of users whose preferences are cached per worker
+    app.config['PREFERENCES_CACHE_SIZE'] = int(os.environ.get('PREFERENCES_CACHE_SIZE', 10000))
+    # Swipe events are buffered in memory and written in batches: ring buffer capacity
+    # (oldest events are dropped beyond it), and the batch size / seconds that trigger a flush
+    app.config['SWIPE_BUFFER_SIZE'] = int(os.environ.get('SWIPE_BUFFER_SIZE', 10000))
+    app.config['SWIPE_FLUSH_SIZE'] = int(os.environ.get('SWIPE_FLUSH_SIZE', 500))
+    app.config['SWIPE_FLUSH_INTERVAL'] = float(os.environ.get('SWIPE_FLUSH_INTERVAL', 2.0))
+    # Audit log (JSON lines): file path, size at which it is rotated and how many rotated
+    # files are kept, how many events may wait in memory, and how often (seconds) waiting
+    # events are written and the file is fsynced
+    app.config['AUDIT_LOG_PATH'] = os.environ.get('AUDIT_LOG_PATH', os.path.join(app.instance_path, 'audit.log'))
+    app.config['AUDIT_LOG_MAX_BYTES'] = int(os.environ.get('AUDIT_LOG_MAX_BYTES', 10 * 1024 * 1024))
+    app.config['AUDIT_LOG_BACKUPS'] = int(os.environ.get('AUDIT_LOG_BACKUPS', 5))
+    app.config['AUDIT_QUEUE_SIZE'] = int(os.environ.get('AUDIT_QUEUE_SIZE', 10000))
+    app.config['AUDIT_FLUSH_INTERVAL'] = float(os.environ.get('AUDIT_FLUSH_INTERVAL', 1.0))
+    app.config['AUDIT_FSYNC_INTERVAL'] = float(os.environ.get('AUDIT_FSYNC_INTERVAL', 5.0))
+    # Poster derivatives: the widths offered in srcset, encoder quality, how many images
+    # are resized in parallel, and where the generated files are cached
+    app.config['POSTER_WIDTHS'] = (270, 540, 810)
+    app.config['POSTER_QUALITY'] = int(os.environ.get('POSTER_QUALITY', 80))
+    app.config['POSTER_WORKERS'] = int(os.environ.get('POSTER_WORKERS', 2))
+    app.config['POSTER_CACHE_DIR'] = os.environ.get('POSTER_CACHE_DIR', os.path.join(app.instance_path, 'poster-cache'))
+    # Number of distinct search queries whose results are kept per worker
+    app.config['SEARCH_CACHE_SIZE'] = int(os.environ.get('SEARCH_CACHE_SIZE', 1024))
+    # When set, /metrics requires an "Authorization: Bearer <token>" header
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+    # Request profiling: admin token that profiles a single request (X-Profile header or
+    # ?profile= query parameter), fraction of all requests profiled at random, seconds
+    # between stack samples, and where profiles are written (the oldest are deleted once
+    # there are more than PROFILE_MAX_FILES)
+    app.config['PROFILE_TOKEN'] = os.environ.get('PROFILE_TOKEN')
+    app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    app.config['PROFILE_INTERVAL'] = float(os.environ.get('PROFILE_INTERVAL', 0.005))
+    app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+    app.config['PROFILE_MAX_FILES'] = int(os.environ.get('PROFILE_MAX_FILES', 200))
+
+    # Logging: root level, per-logger levels, per-logger rate limits (records per second;
+    # warnings and errors are never limited), and an optional file to write to in
+    # addition to stderr. Records are emitted as JSON lines by a background thread.
+    app.config['LOG_LEVEL'] = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    app.config['LOG_LEVELS'] = parse_logger_settings(os.environ.get('LOG_LEVELS', 'sqlalchemy=WARNING'), str.upper)
+    app.config['LOG_RATE_LIMITS'] = parse_logger_settings(os.environ.get('LOG_RATE_LIMITS', 'werkzeug=100'), float)
+    app.config['LOG_FILE'] = os.environ.get('LOG_FILE')
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        if record.stack_info:
+            entry['stack_info'] = record.stack_info
+        if getattr(record, 'suppressed', 0):
+            entry['suppressed'] = record.suppressed
+        return json.dumps(entry, default=str)
+
+# Token bucket per configured logger (a limit on 'werkzeug' covers 'werkzeug.*').
+# Records over the limit are dropped; the next record that gets through carries the
+# number dropped before it as 'suppressed'.
+class RateLimitFilter(logging.Filter):
+    def __init__(self, limits):
+        super().__init__()
+        self.limits = limits
+        self._buckets = {}
+        self._matches = {}
+        self._lock = threading.Lock()
+
+    def _limited_name(self, name):
+        if name not in self._matches:
+            candidate = name
+            while candidate and candidate not in self.limits:
+                candidate = candidate.rpartition('.')[0]
+            self._matches[name] = candidate or None
+        return self._matches[name]
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        name = self._limited_name(record.name)
+        if name is None:
+            return True
+        rate = self.limits[name]
+        now = time.monotonic()
+        with self._lock:
+            tokens, last, suppressed = self._buckets.get(name, (rate, now, 0))
+            tokens = min(rate, tokens + (now - last) * rate)
+            if tokens < 1:
+                self._buckets[name] = (tokens, now, suppressed + 1)
+                return False
+            self._buckets[name] = (tokens - 1, now, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+def call_if_alive(method_ref):
+    method = method_ref()
+    if method is not None:
+        method()
+
+# Base for objects holding per-process state: threads, pools, open files. Threads
+# don't survive a fork, so a forked child runs _reset() (through os.register_at_fork)
+# and the state is started again by _start() on first use in that process.
+class PerProcess:
+    def __init__(self):
+        self._start_lock = threading.Lock()
+        self._started = False
+        # At-fork hooks can't be unregistered, so the hook only holds a weak reference
+        os.register_at_fork(after_in_child=partial(call_if_alive, weakref.WeakMethod(self._after_fork)))
+
+    def _after_fork(self):
+        self._start_lock = threading.Lock()
+        self._started = False
+        self._reset()
+
+    def _ensure_started(self):
+        if not self._started:
+            with self._start_lock:
+                if not self._started:
+                    self._start()
+                    self._started = True
+
+    def _start(self):
+        pass
+
+    def _reset(self):
+        pass
+
+# Hands records to a QueueListener thread, which formats and writes them, so the
+# logging thread only pays for building the record
+class BackgroundQueueHandler(QueueHandler, PerProcess):
+    def __init__(self, handlers):
+        QueueHandler.__init__(self, None)
+        PerProcess.__init__(self)
+        self.handlers = handlers
+        self._listener = None
+
+    def _start(self):
+        self.queue = queue.SimpleQueue()
+        self._listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+        self._listener.start()
+
+    def _reset(self):
+        self._listener = None
+
+    # Render the message and traceback now, while the arguments are still valid, but
+    # leave the JSON formatting to the listener
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_started()
+        self.queue.put_nowait(record)
+
+    def stop(self):
+        with self._start_lock:
+            if self._started:
+                self._listener.stop()
+                self._started = False
+
+def configure_logging(app):
+    formatter = JsonFormatter()
+    handlers = [logging.StreamHandler(sys.stderr)]
+    if app.config['LOG_FILE']:
+        # Reopens the file when it's rotated by logrotate
+        handlers.append(WatchedFileHandler(app.config['LOG_FILE']))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    queue_handler = BackgroundQueueHandler(handlers)
+    queue_handler.addFilter(RateLimitFilter(app.config['LOG_RATE_LIMITS']))
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        # An earlier create_app()'s listener thread would otherwise keep running
+        if isinstance(handler, BackgroundQueueHandler):
+            handler.stop()
+    root.addHandler(queue_handler)
+    root.setLevel(app.config['LOG_LEVEL'])
+    for name, level in app.config['LOG_LEVELS'].items():
+        logging.getLogger(name).setLevel(level)
+    return queue_handler
+
+def configure_database(app):
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return  # in-memory databases use a single static connection
+    pool_options = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'pool_pre_ping': True,
+    }
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {}).update(pool_options)
+    if url.get_backend_name() == 'sqlite' and app.config['SQLITE_READONLY_POOL']:
+        database = url.database if url.query.get('uri') else f'file:{url.database}'
+        readonly_url = url.set(database=database, query={'mode': 'ro', 'uri': 'true'})
+        app.config.setdefault('SQLALCHEMY_BINDS', {})['readonly'] = dict(
+            pool_options, url=readonly_url.render_as_string(hide_password=False))
+
+def sqlite_pragma_listener(pragmas, readonly):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            # The journal mode is a property of the database file, set by the writers
+            if readonly and name == 'journal_mode':
+                continue
+            cursor.execute(f'PRAGMA {name}={value}')
+        if readonly:
+            cursor.execute('PRAGMA query_only=ON')
+        cursor.close()
+    return on_connect
+
+db = SQLAlchemy()
+
+# In-process metrics, exposed on /metrics in the Prometheus text format. Every worker
+# process keeps its own numbers; an update is a dict lookup and a couple of additions
+# under one lock, cheap enough to leave on in production.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+def format_metric_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def format_metric_labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+# A counter, gauge or histogram with one series per combination of label values
+class Metric:
+    def __init__(self, lock, kind, name, documentation, labelnames, buckets):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._lock = lock
+        self._series = {} if labelnames else {(): self._empty()}
+
+    def _empty(self):
+        # Histogram series are the per-bucket counts (last one is +Inf) followed by the sum
+        return [0] * (len(self.buckets) + 1) + [0.0] if self.kind == 'histogram' else 0
+
+    def inc(self, amount=1, labels=()):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def observe(self, value, labels=()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = self._empty()
+            series[index] += 1
+            series[-1] += value
+
+    def render(self, lines):
+        lines.append(f'# HELP {self.name} {self.documentation}')
+        lines.append(f'# TYPE {self.name} {self.kind}')
+        for labels, value in self._series.items():
+            pairs = list(zip(self.labelnames, labels))
+            if self.kind != 'histogram':
+                lines.append(f'{self.name}{format_metric_labels(pairs)} {format_metric_value(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), value):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{format_metric_labels(pairs + [("le", format_metric_value(bound))])} {cumulative}')
+            lines.append(f'{self.name}_sum{format_metric_labels(pairs)} {format_metric_value(value[-1])}')
+            lines.append(f'{self.name}_count{format_metric_labels(pairs)} {cumulative}')
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = []
+
+    def _register(self, kind, name, documentation, labelnames=(), buckets=None):
+        metric = Metric(self._lock, kind, name, documentation, tuple(labelnames), buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register('counter', name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register('gauge', name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register('histogram', name, documentation, labelnames, tuple(buckets))
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for metric in self._metrics:
+                metric.render(lines)
+        return '\n'.join(lines) + '\n'
+
+metrics_registry = MetricsRegistry()
+REQUESTS_IN_FLIGHT = metrics_registry.gauge('http_requests_in_flight', 'Requests currently being handled.')
+REQUESTS_TOTAL = metrics_registry.counter('http_requests_total', 'Requests handled, by endpoint, method and status.', ['endpoint', 'method', 'status'])
+REQUEST_LATENCY = metrics_registry.histogram('http_request_duration_seconds', 'Time spent handling a request.', ['endpoint', 'method'])
+REQUEST_SQL_QUERIES = metrics_registry.histogram('http_request_sql_queries', 'SQL statements executed per request.', ['endpoint'], QUERY_COUNT_BUCKETS)
+REQUEST_SQL_LATENCY = metrics_registry.histogram('http_request_sql_duration_seconds', 'Time spent in SQL per request.', ['endpoint'])
+SQL_LATENCY = metrics_registry.histogram('sql_query_duration_seconds', 'Time spent executing a single SQL statement.', ['bind'])
+TEMPLATE_LATENCY = metrics_registry.histogram('template_render_duration_seconds', 'Time spent rendering a template.', ['template'])
+
+@bp.before_app_request
+def start_request_metrics():
+    REQUESTS_IN_FLIGHT.inc()
+    g.request_started = time.perf_counter()
+    g.sql_queries = 0
+    g.sql_seconds = 0.0
+
+@bp.after_app_request
+def record_response_status(response):
+    g.response_status = response.status_code
+    return response
+
+@bp.teardown_app_request
+def finish_request_metrics(error):
+    started = g.pop('request_started', None)
+    if started is None:
+        return
+    REQUESTS_IN_FLIGHT.inc(-1)
+    # Unmatched URLs share one label so bots probing random paths can't add series
+    endpoint = request.endpoint or 'unmatched'
+    status = str(g.get('response_status', 500))
+    REQUESTS_TOTAL.inc(labels=(endpoint, request.method, status))
+    REQUEST_LATENCY.observe(time.perf_counter() - started, (endpoint, request.method))
+    REQUEST_SQL_QUERIES.observe(g.sql_queries, (endpoint,))
+    REQUEST_SQL_LATENCY.observe(g.sql_seconds, (endpoint,))
+
+def sql_timing_listeners(bind_label):
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info['query_started'] = time.perf_counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop('query_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        SQL_LATENCY.observe(elapsed, (bind_label,))
+        # Statements run by background threads (e.g. the swipe flusher) have no request
+        if has_request_context() and 'request_started' in g:
+            g.sql_queries += 1
+            g.sql_seconds += elapsed
+    return before_cursor_execute, after_cursor_execute
+
+@before_render_template.connect
+def start_template_timer(sender, template, context, **extra):
+    g.template_started = time.perf_counter()
+
+@template_rendered.connect
+def record_template_time(sender, template, context, **extra):
+    started = g.pop('template_started', None)
+    if started is not None:
+        TEMPLATE_LATENCY.observe(time.perf_counter() - started, (template.name or 'string',))
+
+# Connection pragmas and SQL timing for every engine of the app in the current context
+def attach_engine_listeners(app):
+    for bind_key, engine in db.engines.items():
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', sqlite_pragma_listener(app.config['SQLITE_PRAGMAS'], bind_key == 'readonly'))
+        before_cursor_execute, after_cursor_execute = sql_timing_listeners(bind_key or 'default')
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
+# Stack samples collected for one request: root-first tuples of code objects -> count
+class RequestProfile:
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.duration = None
+        self.samples = {}
+
+# Stack-sampling profiler for individual requests. One thread per process wakes every
+# PROFILE_INTERVAL seconds while any request is being profiled, reads the request
+# threads' stacks from sys._current_frames(), and writes finished profiles as
+# collapsed stacks (.folded, for flamegraph.pl) and speedscope JSON.
+class SamplingProfiler(PerProcess):
+    def __init__(self):
+        super().__init__()
+        self.interval = None
+        self.directory = None
+        self.max_profiles = None
+        self._active = {}
+        self._finished = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def init_app(self, app):
+        self.interval = app.config['PROFILE_INTERVAL']
+        self.directory = app.config['PROFILE_DIR']
+        self.max_profiles = app.config['PROFILE_MAX_FILES']
+
+    def _start(self):
+        threading.Thread(target=self._run, name='request-profiler', daemon=True).start()
+
+    def _reset(self):
+        self._active = {}
+        self._finished = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def start(self, name):
+        self._ensure_started()
+        profile = RequestProfile(name)
+        with self._lock:
+            self._active[threading.get_ident()] = profile
+        self._wakeup.set()
+        return profile
+
+    def stop(self, profile):
+        profile.duration = time.perf_counter() - profile.started
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+            self._finished.append(profile)
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            if not self._active and not self._finished:
+                self._wakeup.wait()
+                self._wakeup.clear()
+            with self._lock:
+                active = list(self._active.items())
+            if active:
+                frames = sys._current_frames()
+                for ident, profile in active:
+                    frame = frames.get(ident)
+                    codes = []
+                    while frame is not None:
+                        codes.append(frame.f_code)
+                        frame = frame.f_back
+                    if codes:
+                        stack = tuple(reversed(codes))
+                        profile.samples[stack] = profile.samples.get(stack, 0) + 1
+                del frames, frame
+            # Profiles are written here rather than in the request that was profiled
+            while self._finished:
+                profile = self._finished.popleft()
+                try:
+                    self._write(profile)
+                except Exception:
+                    logging.exception("Error writing profile %s", profile.name)
+            if self._active:
+                time.sleep(self.interval)
+
+    def _write(self, profile):
+        os.makedirs(self.directory, exist_ok=True)
+        frame_index, frames = {}, []
+        stacks = []
+        for stack, count in profile.samples.items():
+            indices = []
+            for code in stack:
+                if code not in frame_index:
+                    frame_index[code] = len(frames)
+                    frames.append({'name': code.co_qualname, 'file': code.co_filename, 'line': code.co_firstlineno})
+                indices.append(frame_index[code])
+            stacks.append((indices, count))
+
+        base = os.path.join(self.directory, profile.name)
+        with open(base + '.folded', 'w') as file:
+            for indices, count in stacks:
+                names = (f"{frames[i]['name']} ({frames[i]['file']}:{frames[i]['line']})" for i in indices)
+                file.write(';'.join(name.replace(';', ':') for name in names) + f' {count}\n')
+        speedscope = {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': profile.name,
+            'exporter': 'app.py',
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': profile.name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': profile.duration,
+                'samples': [indices for indices, _ in stacks],
+                'weights': [count * self.interval for _, count in stacks],
+            }],
+        }
+        with open(base + '.speedscope.json', 'w') as file:
+            json.dump(speedscope, file)
+        self._prune()
+
+    # Keep the newest max_profiles profiles; names start with a timestamp so they sort by age
+    def _prune(self):
+        names = sorted(name[:-len('.folded')] for name in os.listdir(self.directory) if name.endswith('.folded'))
+        for name in names[:max(0, len(names) - self.max_profiles)]:
+            for suffix in ('.folded', '.speedscope.json'):
+                try:
+                    os.remove(os.path.join(self.directory, name + suffix))
+                except FileNotFoundError:
+                    pass
+
+request_profiler = SamplingProfiler()
+
+def profiling_requested():
+    token = current_app.config['PROFILE_TOKEN']
+    if token:
+        supplied = request.headers.get('X-Profile') or request.args.get('profile')
+        if supplied and hmac.compare_digest(supplied.encode(), token.encode()):
+            return True
+    rate = current_app.config['PROFILE_SAMPLE_RATE']
+    return rate > 0 and random.random() < rate
+
+@bp.before_app_request
+def start_profiling():
+    if profiling_requested():
+        name = f'{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}-{os.getpid()}-{request.endpoint or "unmatched"}'
+        g.profile = request_profiler.start(name)
+
+@bp.after_app_request
+def add_profile_header(response):
+    if 'profile' in g:
+        response.headers['X-Profile-Id'] = g.profile.name
+    return response
+
+@bp.teardown_app_request
+def stop_profiling(error):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        request_profiler.stop(profile)
+
+# Engine for read-only queries: the mode=ro pool when enabled, else the main engine
+def read_engine():
+    return db.engines.get('readonly', db.engine)
+
+# Largest value of an SQLite INTEGER column; ids from user input beyond it would
+# overflow in the driver instead of simply not matching
+SQLITE_MAX_INTEGER = 2 ** 63 - 1
 
 # User model for storing login information
 class User(db.Model):
@@ -21,39 +652,1032 @@ class User(db.Model):
     username = db.Column(db.String(150), unique=True, nullable=False)
     password = db.Column(db.String(150), nullable=False)
 
+# Catalog of shows, loaded into the in-memory Catalog at startup
+class Show(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(300), nullable=False)
+    genre = db.Column(db.String(150))
+    image_url = db.Column(db.String(500))
+    rating = db.Column(db.String(20))
+    description = db.Column(db.Text)
+
+# Fields of a show record, in the shape home.html expects
+SHOW_FIELDS = ('id', 'title', 'genre', 'image_url', 'rating', 'description')
+
+# Watchlist entries, one row per (user, show). The composite primary key makes
+# membership checks and removals a single index probe, and the (user_id, added_at)
+# index serves the ordered watchlist page without a sort.
+class WatchlistEntry(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    show_id = db.Column(db.Integer, primary_key=True)
+    added_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        db.Index('ix_watchlist_user_added', 'user_id', 'added_at', 'show_id'),
+    )
+
+# Watchlist helpers: each is one statement regardless of how many shows are passed
+def add_watchlist_entries(user_id, show_ids):
+    rows = [{'user_id': user_id, 'show_id': show_id} for show_id in show_ids]
+    if not rows:
+        return 0
+    stmt = sqlite_insert(WatchlistEntry).on_conflict_do_nothing(index_elements=['user_id', 'show_id'])
+    return db.session.connection().execute(stmt, rows).rowcount
+
+def remove_watchlist_entries(user_id, show_ids):
+    show_ids = list(show_ids)
+    if not show_ids:
+        return 0
+    stmt = delete(WatchlistEntry).where(WatchlistEntry.user_id == user_id, WatchlistEntry.show_id.in_(show_ids))
+    return db.session.connection().execute(stmt).rowcount
+
+# Which of the given shows are already in the user's watchlist
+def watchlist_members(user_id, show_ids):
+    stmt = select(WatchlistEntry.show_id).where(WatchlistEntry.user_id == user_id,
+                                                WatchlistEntry.show_id.in_(list(show_ids)))
+    return set(db.session.execute(stmt).scalars())
+
+def watchlist_show_ids(user_id):
+    stmt = (select(WatchlistEntry.show_id)
+            .where(WatchlistEntry.user_id == user_id)
+            .order_by(WatchlistEntry.added_at, WatchlistEntry.show_id))
+    return db.session.execute(stmt, bind_arguments={'bind': read_engine()}).scalars().all()
+
+# Watchlist pages, oldest first. The cursor is the (added_at, show_id) of the last item
+# on the previous page, so every page is an index range scan on ix_watchlist_user_added
+# and removing items doesn't shift later pages.
+WATCHLIST_PAGE_SIZE = 50
+WATCHLIST_PAGE_MAX = 200
+
+def encode_watchlist_cursor(added_at, show_id):
+    return f'{added_at:%Y%m%d%H%M%S%f}.{show_id}'
+
+# Raises ValueError for a malformed cursor
+def decode_watchlist_cursor(cursor):
+    stamp, _, show_id = cursor.partition('.')
+    added_at, show_id = datetime.strptime(stamp, '%Y%m%d%H%M%S%f'), int(show_id)
+    if not 0 < show_id <= SQLITE_MAX_INTEGER:
+        raise ValueError(f'show id out of range in cursor {cursor!r}')
+    return added_at, show_id
+
+# One more row than asked for is fetched to tell whether there is a next page
+def watchlist_page_stmt(user_id, after, limit):
+    stmt = select(WatchlistEntry.show_id, WatchlistEntry.added_at).where(WatchlistEntry.user_id == user_id)
+    if after is not None:
+        stmt = stmt.where(tuple_(WatchlistEntry.added_at, WatchlistEntry.show_id) > tuple_(*after))
+    return stmt.order_by(WatchlistEntry.added_at, WatchlistEntry.show_id).limit(limit + 1)
+
+def split_watchlist_page(rows, limit):
+    next_cursor = encode_watchlist_cursor(rows[limit - 1].added_at, rows[limit - 1].show_id) if len(rows) > limit else None
+    return [row.show_id for row in rows[:limit]], next_cursor
+
+# (show ids, cursor for the next page or None)
+def watchlist_page(user_id, after=None, limit=WATCHLIST_PAGE_SIZE):
+    rows = db.session.execute(watchlist_page_stmt(user_id, after, limit), bind_arguments={'bind': read_engine()}).all()
+    return split_watchlist_page(rows, limit)
+
+# Per-user data version, bumped in the same transaction as any change to the user's
+# watchlist or settings. ETags for the user's pages are derived from it.
+class UserVersion(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+def bump_user_version(user_id):
+    now = datetime.now(timezone.utc)
+    stmt = sqlite_insert(UserVersion).values(user_id=user_id, version=1, updated_at=now)
+    stmt = stmt.on_conflict_do_update(index_elements=['user_id'],
+                                      set_={'version': UserVersion.version + 1, 'updated_at': now})
+    return db.session.execute(stmt.returning(UserVersion.version)).scalar_one()
+
+# (version, updated_at) for the user, or (0, None) if their data never changed
+def get_user_version(user_id):
+    stmt = select(UserVersion.version, UserVersion.updated_at).where(UserVersion.user_id == user_id)
+    row = db.session.execute(stmt, bind_arguments={'bind': read_engine()}).first()
+    return (row.version, row.updated_at.replace(tzinfo=timezone.utc)) if row else (0, None)
+
+# Display settings, one row per user who changed them from the defaults
+class UserPreferences(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    dark_mode = db.Column(db.Boolean, nullable=False, default=False)
+    text_size = db.Column(db.String(6), nullable=False, default='medium')
+    voice_command = db.Column(db.Boolean, nullable=False, default=False)
+
+# A user's preferences as seen by views and templates: a plain tuple, safe to share
+Preferences = namedtuple('Preferences', ['dark_mode', 'text_size', 'voice_command'])
+DEFAULT_PREFERENCES = Preferences(dark_mode=False, text_size='medium', voice_command=False)
+TEXT_SIZES = ('small', 'medium', 'large')
+
+def preferences_from_row(row):
+    return Preferences(row.dark_mode, row.text_size, row.voice_command) if row else DEFAULT_PREFERENCES
+
+def save_preferences(user_id, preferences):
+    values = preferences._asdict()
+    stmt = sqlite_insert(UserPreferences).values(user_id=user_id, **values)
+    db.session.execute(stmt.on_conflict_do_update(index_elements=['user_id'], set_=values))
+
+# Like/dislike feedback from the swipe page, used for ranking
+class SwipeEvent(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    show_id = db.Column(db.Integer, nullable=False)
+    liked = db.Column(db.Boolean, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_swipe_user_show', 'user_id', 'show_id'),
+    )
+
+# Shows the user swiped right / left on, from the events flushed so far
+def swipe_history(user_id):
+    stmt = select(SwipeEvent.show_id, SwipeEvent.liked).where(SwipeEvent.user_id == user_id)
+    liked_ids, disliked_ids = set(), set()
+    for show_id, liked in db.session.execute(stmt, bind_arguments={'bind': read_engine()}):
+        (liked_ids if liked else disliked_ids).add(show_id)
+    return liked_ids, disliked_ids
+
+# Write-behind queue. put() appends to a bounded in-memory ring (counting what it
+# drops once full) and a background thread hands the waiting items to write() every
+# flush_interval seconds, or as soon as flush_size are waiting. A batch that fails is
+# put back in front of newer items for the next flush. A forked child discards the
+# items it copied from its parent.
+class BackgroundWriter(PerProcess):
+    thread_name = 'background-writer'
+
+    def __init__(self):
+        super().__init__()
+        self.flush_interval = None
+        self.flush_size = None
+        self.dropped = 0
+        self._items = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def configure(self, capacity, flush_interval, flush_size=None):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        with self._lock:
+            self._items = deque(self._items, maxlen=capacity)
+
+    def _start(self):
+        threading.Thread(target=self._run, name=self.thread_name, daemon=True).start()
+
+    def _reset(self):
+        self._items = deque(maxlen=self._items.maxlen)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def put(self, item):
+        self._ensure_started()
+        with self._lock:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            pending = len(self._items)
+        if self.flush_size and pending >= self.flush_size:
+            self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logging.exception("Error in %s", self.thread_name)
+
+    # Writes everything waiting; final is set for the last flush at exit
+    def flush(self, final=False):
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._items)
+                self._items.clear()
+            if batch:
+                try:
+                    self.write(batch)
+                except Exception:
+                    with self._lock:
+                        self._items.extendleft(reversed(batch))
+                    raise
+            self.after_flush(final)
+            return len(batch)
+
+    def write(self, batch):
+        raise NotImplementedError
+
+    def after_flush(self, final):
+        pass
+
+    def flush_at_exit(self):
+        if self._started:
+            try:
+                self.flush(final=True)
+            except Exception:
+                logging.exception("Error in %s at shutdown", self.thread_name)
+
+# Write-behind buffer for swipe events. Requests only append to the buffer; batches
+# are written when SWIPE_FLUSH_SIZE events are waiting or every SWIPE_FLUSH_INTERVAL
+# seconds, and whatever is left is flushed at exit.
+class SwipeBuffer(BackgroundWriter):
+    thread_name = 'swipe-flusher'
+
+    def __init__(self):
+        super().__init__()
+        self.app = None
+
+    def init_app(self, app):
+        self.app = app
+        self.configure(app.config['SWIPE_BUFFER_SIZE'], app.config['SWIPE_FLUSH_INTERVAL'], app.config['SWIPE_FLUSH_SIZE'])
+
+    def append(self, user_id, show_id, liked):
+        self.put({'user_id': user_id, 'show_id': show_id, 'liked': liked, 'created_at': datetime.now(timezone.utc)})
+
+    def write(self, batch):
+        with self.app.app_context():
+            try:
+                for start in range(0, len(batch), self.flush_size):
+                    db.session.connection().execute(insert(SwipeEvent), batch[start:start + self.flush_size])
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+swipe_buffer = SwipeBuffer()
+
 # Root directory for templates and static files (for front-end prototyping)
 TEMPLATE_DIR = "templates"
 STATIC_DIR = "static"
 
-# Ensure necessary directories exist for the project
-os.makedirs(TEMPLATE_DIR, exist_ok=True)
-os.makedirs(STATIC_DIR, exist_ok=True)
+# Audit trail of account events. Requests only append a record (which must never
+# contain secrets) to an in-memory queue; a background thread writes the queue as JSON
+# lines every AUDIT_FLUSH_INTERVAL seconds and fsyncs every AUDIT_FSYNC_INTERVAL.
+# Writes and rotation happen under an flock on a sidecar lock file, so several worker
+# processes can share one log; a worker notices another one's rotation by the inode.
+class AuditLog(BackgroundWriter):
+    thread_name = 'audit-writer'
+
+    def __init__(self):
+        super().__init__()
+        self.path = None
+        self.max_bytes = None
+        self.backups = None
+        self.fsync_interval = None
+        self._file = None
+        self._lock_file = None
+        self._unsynced = False
+        self._last_fsync = time.monotonic()
+
+    def init_app(self, app):
+        self.path = app.config['AUDIT_LOG_PATH']
+        self.max_bytes = app.config['AUDIT_LOG_MAX_BYTES']
+        self.backups = app.config['AUDIT_LOG_BACKUPS']
+        self.fsync_interval = app.config['AUDIT_FSYNC_INTERVAL']
+        self.configure(app.config['AUDIT_QUEUE_SIZE'], app.config['AUDIT_FLUSH_INTERVAL'])
+
+    # A forked worker opens its own files
+    def _reset(self):
+        super()._reset()
+        for file in (self._file, self._lock_file):
+            if file is not None:
+                file.close()
+        self._file = self._lock_file = None
+        self._unsynced = False
+
+    def record(self, event, **fields):
+        self.put({'time': datetime.now(timezone.utc).isoformat(), 'event': event, **fields})
+
+    def write(self, batch):
+        self._write(''.join(json.dumps(entry, default=str) + '\n' for entry in batch).encode('utf-8'))
+
+    def after_flush(self, final):
+        if self._unsynced and (final or time.monotonic() - self._last_fsync >= self.fsync_interval):
+            os.fsync(self._file.fileno())
+            self._unsynced = False
+            self._last_fsync = time.monotonic()
+
+    def _write(self, data):
+        if self._lock_file is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._lock_file = open(self.path + '.lock', 'a')
+        if fcntl is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            file = self._open()
+            size = os.fstat(file.fileno()).st_size
+            if size and size + len(data) > self.max_bytes:
+                self._rotate()
+                file = self._open()
+            file.write(data)
+            self._unsynced = True
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    # The open log file, reopened if another process rotated or removed it
+    def _open(self):
+        if self._file is not None:
+            try:
+                current = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current != os.fstat(self._file.fileno()).st_ino:
+                self._close()
+        if self._file is None:
+            self._file = open(self.path, 'ab', buffering=0)
+        return self._file
+
+    def _close(self):
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = False
+        self._file.close()
+        self._file = None
+
+    def _rotate(self):
+        self._close()
+        if self.backups <= 0:
+            os.remove(self.path)
+            return
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f'{self.path}.{index}'):
+                os.replace(f'{self.path}.{index}', f'{self.path}.{index + 1}')
+        os.replace(self.path, f'{self.path}.1')
+
+audit_log = AuditLog()
+
+# Raised when the hashing pool is saturated or a hash doesn't finish in time
+class HashingBusy(Exception):
+    pass
+
+# Start method for the hashing processes. The fork server itself only preloads
+# werkzeug, but like spawn, multiprocessing re-runs the __main__ script (as
+# __mp_main__) in every hashing process. Servers' entry points are guarded already;
+# a script of your own that starts the app with PASSWORD_HASH_WORKERS > 0 must keep
+# its top-level code under `if __name__ == '__main__':`, as app.py does.
+def hashing_context():
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload(['werkzeug.security'])
+    return context
+
+# Runs password hashing in a process pool so a burst of logins doesn't tie up the
+# request threads. At most workers + queue size hashes are in flight at once.
+class PasswordHasher(PerProcess):
+    def __init__(self):
+        super().__init__()
+        self.app = None
+        self._executor = None
+        self._slots = None
+        self._method_prefix = None
+
+    def init_app(self, app):
+        self.app = app
+
+    # The pool is created lazily and per process, so a prefork server's workers
+    # never share a pool inherited from the master
+    def _start(self):
+        workers = self.app.config['PASSWORD_HASH_WORKERS']
+        # The pool's processes come from a fork server rather than being forked
+        # from this (threaded) process, which can deadlock
+        self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=hashing_context()) if workers > 0 else None
+        self._slots = threading.BoundedSemaphore(workers + self.app.config['PASSWORD_HASH_QUEUE_SIZE'])
+
+    def _reset(self):
+        self._executor = None
+        self._slots = None
+
+    # Starts fn in the pool and returns its future, or None if hashing runs inline.
+    # Raises HashingBusy when every slot is taken.
+    def submit(self, fn, *args):
+        self._ensure_started()
+        executor = self._executor
+        if executor is None:
+            return None
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is only freed once the hash finishes, even if the request gave up on it
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _run(self, fn, *args):
+        future = self.submit(fn, *args)
+        if future is None:
+            return fn(*args)
+        try:
+            return future.result(timeout=self.app.config['PASSWORD_HASH_TIMEOUT'])
+        except FutureTimeoutError:
+            raise HashingBusy()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.app.config['PASSWORD_HASH_METHOD'])
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    # True if the hash was made with a different method or cost than the configured one.
+    # werkzeug fills in default cost parameters, so compare against a real hash's prefix.
+    def needs_rehash(self, pwhash):
+        if self._method_prefix is None:
+            self._method_prefix = generate_password_hash('', self.app.config['PASSWORD_HASH_METHOD']).split('$', 1)[0]
+        return pwhash.split('$', 1)[0] != self._method_prefix
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
 
-# Log credentials to a file
-def log_credentials(username, password):
-    with open('credentials_log.txt', 'a') as file:
-        file.write(f'Username: {username}, Password: {password}\n')
+password_hasher = PasswordHasher()
 
-# User data to simulate watchlist and user preferences (will be replaced by database in the future)
+# One exit hook, so the steps run in order: the write-behind buffers are flushed
+# before the log listener stops, and errors from the flushes still get logged
+def shutdown():
+    swipe_buffer.flush_at_exit()
+    audit_log.flush_at_exit()
+    password_hasher.shutdown()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, BackgroundQueueHandler):
+            handler.stop()
+
+atexit.register(shutdown)
+
+# Built-in shows, used to seed an empty catalog
 user_data = {
     'recommendations': [
         {"id": 1, "title": "Attack on Titan", "genre": "Anime", "image_url": "/static/attack.jpg", "rating": "9/10", "description": "Humans fight against gigantic creatures known as Titans to protect their city."},
         {"id": 2, "title": "Breaking Bad", "genre": "Drama", "image_url": "/static/breaking.jpg", "rating": "10/10", "description": "A high school chemistry teacher turns to a life of crime after being diagnosed with cancer."},
         {"id": 3, "title": "Naruto", "genre": "Anime", "image_url": "/static/naruto.jpg", "rating": "8/10", "description": "A young ninja with a dream of becoming the strongest and gaining the respect of his peers."},
         {"id": 4, "title": "Stranger Things", "genre": "Science Fiction", "image_url": "/static/stranger.jpg", "rating": "9/10", "description": "A group of kids uncover strange events and supernatural forces in their small town."}
-    ],
-    'watchlist': [],
-    'preferences': {
-        'dark_mode': False,
-        'text_size': 'medium',
-        'voice_command': False
-    }
+    ]
 }
 
-# Save the templates to HTML files
+# Catalog store: shows indexed by id so lookups don't scan the recommendations list
+class Catalog:
+    def __init__(self, shows=()):
+        self._shows = {}
+        # Sorted show ids, used as the keyset for paginating the feed
+        self._ids = []
+        # Bumped on every change so derived indexes know when to rebuild
+        self.version = 0
+        # Running hash of the shows as they're added, for HTTP validators (see digest)
+        self._content = hashlib.sha1()
+        for show in shows:
+            self.add(show)
+
+    def add(self, show):
+        show_id = show['id']
+        self.version += 1
+        self._content.update(repr(tuple(show.items())).encode())
+        if show_id not in self._shows:
+            if not self._ids or show_id > self._ids[-1]:
+                self._ids.append(show_id)
+            else:
+                bisect.insort(self._ids, show_id)
+        self._shows[show_id] = show
+
+    def get(self, show_id):
+        return self._shows.get(show_id)
+
+    def clear(self):
+        self.version += 1
+        self._content = hashlib.sha1()
+        self._shows = {}
+        self._ids = []
+
+    # Up to `limit` shows with an id greater than `after`, plus the cursor for the
+    # next page (None once the end of the catalog is reached)
+    def page(self, after=None, limit=20):
+        start = 0 if after is None else bisect.bisect_right(self._ids, after)
+        ids = self._ids[start:start + limit]
+        next_cursor = ids[-1] if ids and start + limit < len(self._ids) else None
+        return [self._shows[show_id] for show_id in ids], next_cursor
+
+    # Hash of the catalog's content, for HTTP validators. Unlike version it's the same
+    # across workers and restarts for the same shows (load_catalog() adds them in id
+    # order), and changes when any show does. It's kept up to date by add(), so reading
+    # it costs nothing.
+    @property
+    def digest(self):
+        return self._content.hexdigest()[:16]
+
+    def __contains__(self, show_id):
+        return show_id in self._shows
+
+    def __iter__(self):
+        return iter(self._shows.values())
+
+    def __len__(self):
+        return len(self._shows)
+
+catalog = Catalog(user_data['recommendations'])
+
+# Ratings are stored as text like "9/10" or "8.5"; returns a score in [0, 1]
+def parse_rating(rating):
+    try:
+        if isinstance(rating, str) and '/' in rating:
+            value, scale = rating.split('/', 1)
+            return float(value) / float(scale)
+        value = float(rating)
+        return value / 10 if value > 1 else value
+    except (TypeError, ValueError, ZeroDivisionError):
+        return 0.0
+
+# Ranks the whole catalog for a user in one vectorized pass. The catalog is parsed
+# into NumPy columns (a one-hot genre matrix and a numeric rating), which are rebuilt
+# whenever the catalog version changes. A user's taste is the genre mix of the shows
+# they liked minus the shows they disliked; each show scores its genre match with
+# that profile plus its rating.
+class RecommendationEngine:
+    GENRE_WEIGHT = 1.0
+    RATING_WEIGHT = 0.5
+    DISLIKE_WEIGHT = 0.5
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._lock = threading.Lock()
+        self._version = None
+
+    def _ensure_built(self):
+        if self._version != self.catalog.version:
+            with self._lock:
+                if self._version != self.catalog.version:
+                    self._build()
+
+    def _build(self):
+        version = self.catalog.version
+        shows = list(self.catalog)
+        genre_lists = [[genre.strip() for genre in (show.get('genre') or '').split(',') if genre.strip()] for show in shows]
+        genre_index = {}
+        for genres in genre_lists:
+            for genre in genres:
+                genre_index.setdefault(genre, len(genre_index))
+
+        rows = [row for row, genres in enumerate(genre_lists) for _ in genres]
+        cols = [genre_index[genre] for genres in genre_lists for genre in genres]
+        one_hot = np.zeros((len(shows), len(genre_index)), dtype=np.float32)
+        one_hot[rows, cols] = 1.0
+
+        ids = np.fromiter((show['id'] for show in shows), dtype=np.int64, count=len(shows))
+        order = np.argsort(ids, kind='stable')
+        self.ids = ids
+        self.genres = one_hot
+        self.genre_index = genre_index
+        self.ratings = np.fromiter((parse_rating(show.get('rating')) for show in shows), dtype=np.float32, count=len(shows))
+        self._sorted_ids = ids[order]
+        self._sorted_rows = order
+        self._version = version
+
+    # Row positions of the given show ids, skipping ids that aren't in the catalog
+    def _rows(self, show_ids):
+        show_ids = np.fromiter(show_ids, dtype=np.int64)
+        if not len(show_ids) or not len(self._sorted_ids):
+            return np.empty(0, dtype=np.int64)
+        pos = np.searchsorted(self._sorted_ids, show_ids)
+        pos = np.minimum(pos, len(self._sorted_ids) - 1)
+        found = self._sorted_ids[pos] == show_ids
+        return self._sorted_rows[pos[found]]
+
+    def scores(self, liked_ids=(), disliked_ids=()):
+        self._ensure_built()
+        profile = self.genres[self._rows(liked_ids)].sum(axis=0)
+        profile -= self.DISLIKE_WEIGHT * self.genres[self._rows(disliked_ids)].sum(axis=0)
+        total = np.abs(profile).sum()
+        if total:
+            profile /= total
+        return self.GENRE_WEIGHT * (self.genres @ profile) + self.RATING_WEIGHT * self.ratings
+
+    # The k best-scoring shows, best first, leaving out anything in exclude_ids
+    def recommend(self, liked_ids=(), disliked_ids=(), exclude_ids=(), k=20):
+        liked_ids, disliked_ids = list(liked_ids), list(disliked_ids)
+        scores = self.scores(liked_ids, disliked_ids)
+        scores[self._rows(list(exclude_ids))] = -np.inf
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        top = top[np.isfinite(scores[top])]
+        return [self.catalog.get(int(show_id)) for show_id in self.ids[top]]
+
+recommendation_engine = RecommendationEngine(catalog)
+
+# Insert or update shows by id; one executemany statement per call
+def upsert_shows(rows):
+    if not rows:
+        return
+    stmt = sqlite_insert(Show)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Show.id],
+        set_={field: stmt.excluded[field] for field in SHOW_FIELDS if field != 'id'})
+    db.session.connection().execute(stmt, rows)
+
+# Replace the in-memory catalog with the show table, streaming rows from the
+# database. An empty table is seeded with the built-in recommendations first.
+CATALOG_LOAD_BATCH = 10000
+
+def load_catalog():
+    if not inspect(db.engine).has_table(Show.__tablename__):
+        return False
+    ensure_search_index()
+    if db.session.execute(select(Show.id).limit(1)).first() is None:
+        upsert_shows([{field: show.get(field) for field in SHOW_FIELDS} for show in user_data['recommendations']])
+        db.session.commit()
+    stmt = select(Show.__table__).order_by(Show.id).execution_options(yield_per=CATALOG_LOAD_BATCH)
+    catalog.clear()
+    for row in db.session.execute(stmt).mappings():
+        # Leave out empty fields so the templates fall back to their placeholders
+        catalog.add({field: value for field, value in row.items() if value is not None})
+    global catalog_loaded_at
+    catalog_loaded_at = datetime.now(timezone.utc)
+    return True
+
+# Full-text index over the show table. It's an external-content FTS5 table, so it
+# only stores the index; triggers keep it in sync with every insert, update and
+# delete (including the importer's upserts). The prefix indexes serve type-ahead.
+SEARCH_INDEX_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS show_fts USING fts5(
+        title, genre, description,
+        content='show', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS show_fts_insert AFTER INSERT ON show BEGIN
+        INSERT INTO show_fts(rowid, title, genre, description)
+        VALUES (new.id, new.title, new.genre, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS show_fts_delete AFTER DELETE ON show BEGIN
+        INSERT INTO show_fts(show_fts, rowid, title, genre, description)
+        VALUES ('delete', old.id, old.title, old.genre, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS show_fts_update AFTER UPDATE ON show BEGIN
+        INSERT INTO show_fts(show_fts, rowid, title, genre, description)
+        VALUES ('delete', old.id, old.title, old.genre, old.description);
+        INSERT INTO show_fts(rowid, title, genre, description)
+        VALUES (new.id, new.title, new.genre, new.description);
+    END""",
+]
+
+# Create the search index if it's missing, indexing any shows already in the table
+def ensure_search_index():
+    connection = db.session.connection()
+    exists = connection.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'show_fts'")).first()
+    for ddl in SEARCH_INDEX_DDL:
+        connection.execute(text(ddl))
+    if not exists:
+        connection.execute(text("INSERT INTO show_fts(show_fts) VALUES ('rebuild')"))
+    db.session.commit()
+
+# Turn user input into an FTS5 query: every word must match, and the last one is
+# treated as a prefix so results update as the user types
+SEARCH_MAX_TERMS = 8
+
+def search_match_expression(query):
+    terms = re.findall(r'\w+', query.lower())[:SEARCH_MAX_TERMS]
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+# Matching show ids, best first. BM25 weights title matches above genre, and genre
+# above description. Hot queries are answered from an LRU cache (see
+# configure_search_cache()) that is keyed on the catalog version, so it's dropped
+# whenever the catalog is reloaded.
+def find_show_ids(match, limit, catalog_version):
+    stmt = text("SELECT rowid FROM show_fts WHERE show_fts MATCH :match "
+                "ORDER BY bm25(show_fts, 10.0, 2.0, 1.0) LIMIT :limit")
+    rows = db.session.execute(stmt, {'match': match, 'limit': limit}, bind_arguments={'bind': read_engine()})
+    return tuple(show_id for show_id, in rows)
+
+search_show_ids = find_show_ids
+
+def configure_search_cache(app):
+    global search_show_ids
+    search_show_ids = lru_cache(maxsize=app.config['SEARCH_CACHE_SIZE'])(find_show_ids)
+
+def search_shows(query, limit=10):
+    match = search_match_expression(query)
+    if match is None:
+        return []
+    shows = (catalog.get(show_id) for show_id in search_show_ids(match, limit, catalog.version))
+    return [show for show in shows if show]
+
+catalog_loaded = threading.Event()
+catalog_loaded_at = datetime.now(timezone.utc)
+catalog_load_lock = threading.Lock()
+
+@bp.before_app_request
+def ensure_catalog_loaded():
+    if not catalog_loaded.is_set():
+        with catalog_load_lock:
+            if not catalog_loaded.is_set():
+                load_catalog()
+                catalog_loaded.set()
+
+# Raised for catalog records that can't be turned into a show
+class InvalidShow(ValueError):
+    pass
+
+def validate_show(record):
+    if not isinstance(record, dict):
+        raise InvalidShow(f'expected an object, got {type(record).__name__}')
+    raw_id = record.get('id')
+    # Integral floats (1.0) are fine, but 1.7 must not be truncated to 1
+    if isinstance(raw_id, float) and raw_id.is_integer():
+        raw_id = int(raw_id)
+    if isinstance(raw_id, bool) or not isinstance(raw_id, (int, str)):
+        raise InvalidShow(f'invalid id {raw_id!r}')
+    try:
+        show_id = int(raw_id)
+    except ValueError:
+        raise InvalidShow(f'invalid id {raw_id!r}')
+    if not 0 < show_id <= SQLITE_MAX_INTEGER:
+        raise InvalidShow(f'invalid id {show_id}')
+    show = {'id': show_id}
+    for field in SHOW_FIELDS[1:]:
+        value = record.get(field)
+        value = str(value).strip() if value is not None else ''
+        show[field] = value or None
+    if not show['title']:
+        raise InvalidShow(f'show {show_id} has no title')
+    return show
+
+# Stream raw records from a CSV (with a header row) or JSON Lines file
+def iter_catalog_records(path, fmt):
+    with open(path, newline='', encoding='utf-8') as file:
+        if fmt == 'csv':
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        yield {}  # rejected by validate_show like any other bad record
+
+# Create the tables and load (seeding if empty) the catalog. Run once per deployment,
+# and again after adding models, before starting the workers: they don't create
+# tables themselves, since several processes doing it at once race each other.
+@bp.cli.command('init-db')
+def init_db_command():
+    db.create_all()
+    load_catalog()
+    click.echo('Database initialised.')
+
+# Bulk-load a catalog file into the show table. Records are streamed and upserted in
+# fixed-size chunks, so memory stays flat and re-running the same file is harmless.
+# Progress is checkpointed after every chunk; --resume skips what was already committed.
+# Running workers pick up the new catalog when they restart.
+@bp.cli.command('import-catalog')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+@click.option('--chunk-size', default=5000, show_default=True, help='Records per insert batch.')
+@click.option('--resume', is_flag=True, help='Continue an interrupted import from its checkpoint.')
+def import_catalog_command(path, fmt, chunk_size, resume):
+    fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    checkpoint_path = path + '.import-progress'
+    done = 0
+    if resume and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as file:
+            done = int(file.read().strip() or 0)
+        click.echo(f'Resuming after {done} records.')
+
+    db.create_all()
+    ensure_search_index()
+    records = itertools.islice(iter_catalog_records(path, fmt), done, None)
+    imported = skipped = 0
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            break
+        rows = []
+        for number, record in enumerate(chunk, start=done + 1):
+            try:
+                rows.append(validate_show(record))
+            except InvalidShow as e:
+                skipped += 1
+                logging.warning(f"Skipping catalog record {number}: {e}")
+        upsert_shows(rows)
+        db.session.commit()
+        done += len(chunk)
+        imported += len(rows)
+        write_if_changed(checkpoint_path, str(done))
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    click.echo(f'Imported {imported} shows ({skipped} skipped).')
+
+# Seed users for load testing: <prefix>1 .. <prefix>N, all with the same password.
+# Existing usernames are left alone, so the command can be re-run to top up a table.
+@bp.cli.command('create-users')
+@click.argument('count', type=int)
+@click.option('--prefix', default='loadtest', show_default=True, help='Usernames are <prefix><n>.')
+@click.option('--password', default='password', show_default=True, help='Password shared by every user.')
+@click.option('--chunk-size', default=5000, show_default=True, help='Users per insert batch.')
+def create_users_command(count, prefix, password, chunk_size):
+    db.create_all()
+    # The password is the same for everyone, so it's hashed once
+    password_hash = generate_password_hash(password, current_app.config['PASSWORD_HASH_METHOD'])
+    stmt = sqlite_insert(User).on_conflict_do_nothing(index_elements=['username'])
+    created = 0
+    for start in range(1, count + 1, chunk_size):
+        rows = [{'username': f'{prefix}{n}', 'password': password_hash}
+                for n in range(start, min(start + chunk_size, count + 1))]
+        created += db.session.connection().execute(stmt, rows).rowcount
+        db.session.commit()
+    click.echo(f'Created {created} users ({count - created} already existed).')
+
+# Template sources keyed by filename; install_templates() decides how they're served
+TEMPLATES = {}
+
 def save_template(filename, content):
-    with open(os.path.join(TEMPLATE_DIR, filename), 'w', encoding='utf-8') as file:
-        file.write(content)
+    TEMPLATES[filename] = content
+
+# Write a file only if its content hash differs from what's on disk. The write goes
+# to a temp file that is renamed into place, so concurrent readers never see a
+# partially written file.
+def write_if_changed(path, content):
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    try:
+        with open(path, 'rb') as file:
+            if hashlib.sha256(file.read()).digest() == hashlib.sha256(data).digest():
+                return False
+    except FileNotFoundError:
+        pass
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+def install_templates(app):
+    if app.config['TEMPLATE_MODE'] == 'memory':
+        # Templates on disk are still found as a fallback (e.g. for blueprints)
+        app.jinja_env.loader = ChoiceLoader([DictLoader(TEMPLATES), app.jinja_env.loader])
+    else:
+        # Ensure necessary directories exist for the project
+        os.makedirs(TEMPLATE_DIR, exist_ok=True)
+        os.makedirs(STATIC_DIR, exist_ok=True)
+        for filename, content in TEMPLATES.items():
+            write_if_changed(os.path.join(TEMPLATE_DIR, filename), content)
+
+    cache_dir = app.config['TEMPLATE_BYTECODE_CACHE_DIR']
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+# Static assets shared by the templates, keyed by logical name. build_assets()
+# fingerprints them; templates reference them through asset_url().
+ASSETS = {}
+
+def save_asset(name, content):
+    ASSETS[name] = content
+
+# File: app.css
+# =====================================
+app_css = """
+body {
+    font-family: Arial, sans-serif;
+    margin: 0;
+    padding: 0;
+    background-color: #a9a9a9;
+    display: flex;
+    flex-direction: column;
+    align-items: center;
+    justify-content: center;
+    min-height: 100vh;
+    color: black;
+}
+.navbar {
+    display: flex;
+    justify-content: space-between;
+    align-items: center;
+    background-color: #6e6e6e;
+    padding: 10px;
+    width: 100%;
+    position: fixed;
+    top: 0;
+    left: 0;
+    z-index: 1000;
+    box-sizing: border-box;
+}
+.password-container {
+    position: relative;
+    width: calc(100% - 20px);
+    margin: 10px 10px 0;
+}
+.password-container input[type="password"] {
+    width: 100%;
+    padding: 10px;
+    border: 1px solid #ccc;
+    border-radius: 5px;
+    box-sizing: border-box;
+}
+.password-container .toggle-password {
+    position: absolute;
+    right: 10px;
+    top: 50%;
+    transform: translateY(-50%);
+    cursor: pointer;
+    font-size: 1.2em;
+}
+"""
+save_asset('app.css', app_css)
+# =====================================
+
+# File: auth.js
+# =====================================
+auth_js = """
+function togglePasswordVisibility(element) {
+    const passwordInput = element.previousElementSibling;
+    if (passwordInput.type === 'password') {
+        passwordInput.type = 'text';
+        element.textContent = '🙈';
+    } else {
+        passwordInput.type = 'password';
+        element.textContent = '👁️';
+    }
+}
+"""
+save_asset('auth.js', auth_js)
+# =====================================
+
+# File: theme.js
+# =====================================
+theme_js = """
+// Applies the user's saved preferences, rendered by the server onto <body>
+document.addEventListener('DOMContentLoaded', () => {
+    const { darkMode, textSize } = document.body.dataset;
+    if (darkMode === 'true') {
+        document.body.style.backgroundColor = '#333';
+        document.body.style.color = 'white';
+    }
+    if (textSize) {
+        document.body.style.fontSize = textSize;
+    }
+});
+"""
+save_asset('theme.js', theme_js)
+# =====================================
+
+# File: watchlist-batch.js
+# =====================================
+# Coalesces watchlist adds/removes and swipes made in quick succession into one
+# request to /watchlist/batch. Each call returns a promise for that operation's own
+# result.
+watchlist_batch_js = """
+const watchlistBatch = (() => {
+    const FLUSH_DELAY_MS = 250;
+    const MAX_BATCH = 50;
+    let pending = [];
+    let timer = null;
+
+    function flush() {
+        clearTimeout(timer);
+        timer = null;
+        if (pending.length === 0) {
+            return;
+        }
+        const batch = pending;
+        pending = [];
+        fetch('/watchlist/batch', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ operations: batch.map(item => item.operation) }),
+            keepalive: true
+        })
+            .then(response => response.json())
+            .then(data => data.results.forEach((result, i) => batch[i].resolve(result)))
+            .catch(error => batch.forEach(item => item.reject(error)));
+    }
+
+    function enqueue(operation) {
+        return new Promise((resolve, reject) => {
+            pending.push({ operation: operation, resolve: resolve, reject: reject });
+            if (pending.length >= MAX_BATCH) {
+                flush();
+            } else if (timer === null) {
+                timer = setTimeout(flush, FLUSH_DELAY_MS);
+            }
+        });
+    }
+
+    window.addEventListener('pagehide', flush);
+
+    return {
+        add: showId => enqueue({ op: 'add', show_id: showId }),
+        remove: showId => enqueue({ op: 'remove', show_id: showId }),
+        swipe: (showId, liked) => enqueue({ op: 'swipe', show_id: showId, liked: liked }),
+        flush: flush
+    };
+})();
+"""
+save_asset('watchlist-batch.js', watchlist_batch_js)
+# =====================================
 
 # File: login.html
 # =====================================
@@ -65,19 +1689,8 @@ login_page_template = """
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Login</title>
     <link rel="stylesheet" href="/static/style.css">
+    <link rel="stylesheet" href="{{ asset_url('app.css') }}">
     <style>
-        body {
-            font-family: Arial, sans-serif;
-            margin: 0;
-            padding: 0;
-            background-color: #a9a9a9;
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            justify-content: center;
-            min-height: 100vh;
-            color: black;
-        }
         .login-container {
             background-color: #6e6e6e;
             padding: 30px;
@@ -131,26 +1744,6 @@ login_page_template = """
             align-items: center;
             margin: 10px;
         }
-        .password-container {
-            position: relative;
-            width: calc(100% - 20px);
-            margin: 10px 10px 0;
-        }
-        .password-container input[type="password"] {
-            width: 100%;
-            padding: 10px;
-            border: 1px solid #ccc;
-            border-radius: 5px;
-            box-sizing: border-box;
-        }
-        .password-container .toggle-password {
-            position: absolute;
-            right: 10px;
-            top: 50%;
-            transform: translateY(-50%);
-            cursor: pointer;
-            font-size: 1.2em;
-        }
     </style>
 </head>
 <body>
@@ -172,18 +1765,7 @@ login_page_template = """
         </form>
         <a href="/signup">No account? Sign up.</a>
     </div>
-    <script>
-        function togglePasswordVisibility(element) {
-            const passwordInput = element.previousElementSibling;
-            if (passwordInput.type === 'password') {
-                passwordInput.type = 'text';
-                element.textContent = '🙈';
-            } else {
-                passwordInput.type = 'password';
-                element.textContent = '👁️';
-            }
-        }
-    </script>
+    <script src="{{ asset_url('auth.js') }}"></script>
 </body>
 </html>
 """
@@ -200,19 +1782,8 @@ signup_page_template = """
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Sign Up</title>
     <link rel="stylesheet" href="/static/style.css">
+    <link rel="stylesheet" href="{{ asset_url('app.css') }}">
     <style>
-        body {
-            font-family: Arial, sans-serif;
-            margin: 0;
-            padding: 0;
-            background-color: #a9a9a9;
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            justify-content: center;
-            min-height: 100vh;
-            color: black;
-        }
         .signup-container {
             background-color: #6e6e6e;
             padding: 30px;
@@ -247,26 +1818,6 @@ signup_page_template = """
         .signup-container button:hover {
             background-color: #333;
         }
-        .password-container {
-            position: relative;
-            width: calc(100% - 20px);
-            margin: 10px 10px 0;
-        }
-        .password-container input[type="password"] {
-            width: 100%;
-            padding: 10px;
-            border: 1px solid #ccc;
-            border-radius: 5px;
-            box-sizing: border-box;
-        }
-        .password-container .toggle-password {
-            position: absolute;
-            right: 10px;
-            top: 50%;
-            transform: translateY(-50%);
-            cursor: pointer;
-            font-size: 1.2em;
-        }
     </style>
 </head>
 <body>
@@ -285,18 +1836,7 @@ signup_page_template = """
             <button type="submit">Sign Up</button>
         </form>
     </div>
-    <script>
-        function togglePasswordVisibility(element) {
-            const passwordInput = element.previousElementSibling;
-            if (passwordInput.type === 'password') {
-                passwordInput.type = 'text';
-                element.textContent = '🙈';
-            } else {
-                passwordInput.type = 'password';
-                element.textContent = '👁️';
-            }
-        }
-    </script>
+    <script src="{{ asset_url('auth.js') }}"></script>
 </body>
 </html>
 """
@@ -313,32 +1853,10 @@ home_page_template = """
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Show Recommendations</title>
     <link rel="stylesheet" href="/static/style.css">
+    <link rel="stylesheet" href="{{ asset_url('app.css') }}">
+    <script src="{{ asset_url('theme.js') }}" defer></script>
+    <script src="{{ asset_url('watchlist-batch.js') }}"></script>
     <style>
-        body {
-            font-family: Arial, sans-serif;
-            margin: 0;
-            padding: 0;
-            background-color: #a9a9a9;
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            justify-content: center;
-            min-height: 100vh;
-            color: black;
-        }
-        .navbar {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            background-color: #6e6e6e;
-            padding: 10px;
-            width: 100%;
-            position: fixed;
-            top: 0;
-            left: 0;
-            z-index: 1000;
-            box-sizing: border-box;
-        }
         .navbar a {
             color: white;
             text-decoration: none;
@@ -419,7 +1937,7 @@ home_page_template = """
         }
     </style>
 </head>
-<body>
+<body data-dark-mode="{{ 'true' if preferences.dark_mode else 'false' }}" data-text-size="{{ preferences.text_size }}">
     <nav class="navbar">
         <div class="menu-icon" onclick="window.location.href='/watchlist'">
             <img src="/static/Task-View--Streamline-Carbon.svg" alt="Watchlist" style="width: 30px; height: 30px;">
@@ -433,12 +1951,13 @@ home_page_template = """
     </nav>
     <main class="center-content">
         <section id="recommendation-card" class="recommendation-card">
-            <img id="show-image" src="{{ recommendations[0]['image_url'] if 'image_url' in recommendations[0] else '/static/placeholder.jpg' }}" alt="Show/Movie Image" class="show-image">
+            {% set image_url = show['image_url'] if show and 'image_url' in show else '/static/placeholder.jpg' %}
+            <img id="show-image" src="{{ image_url }}" srcset="{{ poster_srcset(image_url) }}" sizes="270px" alt="Show/Movie Image" class="show-image">
             <div class="info">
-                <h2 id="show-title">{{ recommendations[0]['title'] }}</h2>
-                <p id="show-genre">{{ recommendations[0]['genre'] if 'genre' in recommendations[0] else 'Genre' }}</p>
-                <p id="show-rating">{{ recommendations[0]['rating'] if 'rating' in recommendations[0] else 'Rating' }}</p>
-                <p id="show-description" style="font-weight: bold;">{{ recommendations[0]['description'] if 'description' in recommendations[0] else 'Short summary of the show...' }}</p>
+                <h2 id="show-title">{{ show['title'] if show else 'No more shows available.' }}</h2>
+                <p id="show-genre">{{ show['genre'] if show and 'genre' in show else 'Genre' }}</p>
+                <p id="show-rating">{{ show['rating'] if show and 'rating' in show else 'Rating' }}</p>
+                <p id="show-description" style="font-weight: bold;">{{ show['description'] if show and 'description' in show else 'Short summary of the show...' }}</p>
             </div>
         </section>
         <div class="swipe-actions">
@@ -447,8 +1966,61 @@ home_page_template = """
         </div>
     </main>
     <script>
-        let currentIndex = 0;
-        const recommendations = {{ recommendations|tojson }};
+        // Only the first card is rendered server-side; the rest are fetched a page
+        // at a time from /api/recommendations as the queue runs low.
+        const PAGE_SIZE = 20;
+        const PREFETCH_THRESHOLD = 5;
+        let currentShow = {{ show|tojson }};
+        let nextCursor = {{ next_cursor|tojson }};
+        let queue = [];
+        let loading = null;
+        const POSTER_WIDTHS = {{ config['POSTER_WIDTHS']|tojson }};
+
+        // Same srcset as the server-side poster_srcset() helper
+        function posterSrcset(imageUrl) {
+            if (!imageUrl || !imageUrl.startsWith('/static/')) {
+                return '';
+            }
+            const filename = imageUrl.slice('/static/'.length);
+            return POSTER_WIDTHS.map(width => '/posters/' + width + '/' + filename + ' ' + width + 'w').join(', ');
+        }
+
+        // Warm the browser cache with the next card's poster so the swipe doesn't wait on it
+        function preloadPoster(show) {
+            if (!show) {
+                return;
+            }
+            const image = new Image();
+            image.sizes = '270px';
+            image.srcset = posterSrcset(show.image_url);
+            image.src = show.image_url || '/static/placeholder.jpg';
+        }
+
+        function fetchMore() {
+            if (loading) {
+                return loading;
+            }
+            if (nextCursor === null) {
+                return Promise.resolve();
+            }
+            loading = fetch('/api/recommendations?after=' + nextCursor + '&limit=' + PAGE_SIZE)
+                .then(response => response.json())
+                .then(data => {
+                    queue.push(...data.shows);
+                    nextCursor = data.next;
+                })
+                .finally(() => {
+                    loading = null;
+                });
+            return loading;
+        }
+
+        function nextShow() {
+            if (queue.length > 0 || nextCursor === null) {
+                return Promise.resolve(queue.shift());
+            }
+            return fetchMore().then(() => queue.shift());
+        }
 
         function animateSwipe(direction) {
             const image = document.getElementById('show-image');
@@ -459,7 +2031,6 @@ home_page_template = """
             }
             image.style.opacity = '0';
             setTimeout(() => {
-                currentIndex++;
                 updateShow();
                 setTimeout(() => {
                     image.style.opacity = '1';
@@ -468,10 +2039,22 @@ home_page_template = """
         }
 
         function updateShow() {
-            if (currentIndex < recommendations.length) {
-                const show = recommendations[currentIndex];
+            nextShow().then(show => {
+                currentShow = show;
+                if (queue.length < PREFETCH_THRESHOLD) {
+                    fetchMore();
+                }
+                renderShow(show);
+                preloadPoster(queue[0]);
+            });
+        }
+
+        function renderShow(show) {
+            if (show) {
                 const image = document.getElementById('show-image');
-                image.src = show.image_url || '/static/placeholder.jpg';
+                const imageUrl = show.image_url || '/static/placeholder.jpg';
+                image.srcset = posterSrcset(imageUrl);
+                image.src = imageUrl;
                 document.getElementById('show-title').textContent = show.title;
                 document.getElementById('show-genre').textContent = show.genre || 'Genre';
                 document.getElementById('show-rating').textContent = show.rating || 'Rating';
@@ -482,25 +2065,31 @@ home_page_template = """
             }
         }
 
+        // Sent with the next watchlist batch rather than as a request of its own
+        function recordSwipe(showId, liked) {
+            watchlistBatch.swipe(showId, liked).catch(() => {});
+        }
+
         function swipeLeft() {
+            if (!currentShow) {
+                return;
+            }
+            recordSwipe(currentShow.id, false);
             animateSwipe('left');
         }
 
         function swipeRight() {
-            fetch('/add-to-watchlist/' + recommendations[currentIndex].id, { method: 'POST' })
-                .then(response => response.json())
-                .then(data => {
-                    animateSwipe('right');
-                })
+            if (!currentShow) {
+                return;
+            }
+            recordSwipe(currentShow.id, true);
+            watchlistBatch.add(currentShow.id)
                 .catch(error => alert('Error adding to watchlist'));
+            animateSwipe('right');
         }
 
         document.addEventListener('DOMContentLoaded', () => {
-            const darkModeEnabled = localStorage.getItem('dark_mode') === 'true';
-            if (darkModeEnabled) {
-                document.body.style.backgroundColor = '#333';
-                document.body.style.color = 'white';
-            }
+            fetchMore().then(() => preloadPoster(queue[0]));
         });
     </script>
 </body>
@@ -519,32 +2108,10 @@ watchlist_page_template = """
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Watchlist</title>
     <link rel="stylesheet" href="/static/style.css">
+    <link rel="stylesheet" href="{{ asset_url('app.css') }}">
+    <script src="{{ asset_url('theme.js') }}" defer></script>
+    <script src="{{ asset_url('watchlist-batch.js') }}"></script>
     <style>
-        body {
-            font-family: Arial, sans-serif;
-            margin: 0;
-            padding: 0;
-            background-color: #a9a9a9;
-            color: black;
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            justify-content: center;
-            min-height: 100vh;
-        }
-        .navbar {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            background-color: #6e6e6e;
-            padding: 10px;
-            width: 100%;
-            position: fixed;
-            top: 0;
-            left: 0;
-            z-index: 1000;
-            box-sizing: border-box;
-        }
         .content {
             margin-top: 100px;
             width: 100%;
@@ -569,7 +2136,7 @@ watchlist_page_template = """
         }
     </style>
 </head>
-<body>
+<body data-dark-mode="{{ 'true' if preferences.dark_mode else 'false' }}" data-text-size="{{ preferences.text_size }}">
     <nav class="navbar">
         <div class="menu-icon" onclick="window.location.href='/'" style="cursor: pointer;">
             <img src="/static/Home--Streamline-Carbon.svg" alt="Home" style="width: 30px; height: 30px;">
@@ -583,6 +2150,7 @@ watchlist_page_template = """
     </nav>
     <div class="content">
         <div id="watchlist">
+            {# Only the first page is rendered here; the rest is loaded while scrolling #}
             {% for item in watchlist %}
             <div class="watchlist-item" id="watchlist-item-{{ item.id }}">
                 <span>{{ item.title }}</span>
@@ -593,11 +2161,70 @@ watchlist_page_template = """
             </div>
             {% endfor %}
         </div>
+        <div id="watchlist-more"></div>
     </div>
     <script>
+        const PAGE_SIZE = {{ page_size }};
+        let nextCursor = {{ next_cursor|tojson }};
+        let loading = null;
+
+        // Same markup as the server-rendered items above
+        function renderWatchlistItem(show) {
+            const item = document.createElement('div');
+            item.className = 'watchlist-item';
+            item.id = 'watchlist-item-' + show.id;
+            const title = document.createElement('span');
+            title.textContent = show.title;
+            const actions = document.createElement('div');
+            actions.className = 'watchlist-actions';
+            const removeButton = document.createElement('button');
+            removeButton.textContent = '🗑️';
+            removeButton.addEventListener('click', () => removeFromWatchlist(show.id));
+            const infoButton = document.createElement('button');
+            infoButton.textContent = 'ℹ';
+            infoButton.addEventListener('click', () => alert('Show info feature not implemented yet.'));
+            actions.append(removeButton, infoButton);
+            item.append(title, actions);
+            return item;
+        }
+
+        function fetchMore() {
+            if (loading) {
+                return loading;
+            }
+            if (nextCursor === null) {
+                return Promise.resolve();
+            }
+            loading = fetch('/api/watchlist?after=' + encodeURIComponent(nextCursor) + '&limit=' + PAGE_SIZE)
+                .then(response => response.json())
+                .then(data => {
+                    const list = document.getElementById('watchlist');
+                    data.shows.forEach(show => list.appendChild(renderWatchlistItem(show)));
+                    nextCursor = data.next;
+                })
+                .finally(() => {
+                    loading = null;
+                });
+            return loading;
+        }
+
+        // Load the next page when the end of the list comes near. Observing again after
+        // each page re-checks the sentinel in case it is still on screen.
+        const sentinel = document.getElementById('watchlist-more');
+        const observer = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting) && nextCursor !== null) {
+                fetchMore().then(() => {
+                    observer.unobserve(sentinel);
+                    if (nextCursor !== null) {
+                        observer.observe(sentinel);
+                    }
+                });
+            }
+        }, { rootMargin: '400px' });
+        observer.observe(sentinel);
+
         function removeFromWatchlist(showId) {
-            fetch(`/remove-from-watchlist/${showId}`, { method: 'POST' })
-                .then(response => response.json()).then(data => {
+            watchlistBatch.remove(showId).then(data => {
     if (data.message.includes('removed')) {
         const item = document.getElementById('watchlist-item-' + showId);
         item.style.transition = 'opacity 0.5s ease-out';
@@ -609,14 +2236,6 @@ watchlist_page_template = """
 })
                 .catch(error => alert('Error removing from watchlist'));
         }
-
-        document.addEventListener('DOMContentLoaded', () => {
-            const darkModeEnabled = localStorage.getItem('dark_mode') === 'true';
-            if (darkModeEnabled) {
-                document.body.style.backgroundColor = '#333';
-                document.body.style.color = 'white';
-            }
-        });
     </script>
 </body>
 </html>
@@ -634,32 +2253,8 @@ settings_page_template = """
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Settings</title>
     <link rel="stylesheet" href="/static/style.css">
+    <link rel="stylesheet" href="{{ asset_url('app.css') }}">
     <style>
-        body {
-            font-family: Arial, sans-serif;
-            margin: 0;
-            padding: 0;
-            background-color: #a9a9a9;
-            color: black;
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            justify-content: center;
-            min-height: 100vh;
-        }
-        .navbar {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            background-color: #6e6e6e;
-            padding: 10px;
-            width: 100%;
-            position: fixed;
-            top: 0;
-            left: 0;
-            z-index: 1000;
-            box-sizing: border-box;
-        }
         .content {
             margin-top: 70px;
             display: flex;
@@ -703,7 +2298,7 @@ settings_page_template = """
     <div class="content">
         <div class="settings-option">
             <label for="text_size">Text Size:</label>
-            <select id="text_size" name="text_size" onchange="updateTextSize()">
+            <select id="text_size" name="text_size" onchange="updateTextSize(); saveSettings()">
                 <option value="small" {% if preferences.text_size == 'small' %}selected{% endif %}>Small</option>
                 <option value="medium" {% if preferences.text_size == 'medium' %}selected{% endif %}>Medium</option>
                 <option value="large" {% if preferences.text_size == 'large' %}selected{% endif %}>Large</option>
@@ -711,33 +2306,45 @@ settings_page_template = """
         </div>
         <div class="settings-option">
             <label for="dark_mode">Dark Mode:</label>
-            <input type="checkbox" id="dark_mode" name="dark_mode" {% if preferences.dark_mode %}checked{% endif %} onchange="toggleDarkMode()">
+            <input type="checkbox" id="dark_mode" name="dark_mode" {% if preferences.dark_mode %}checked{% endif %} onchange="toggleDarkMode(); saveSettings()">
         </div>
         <div class="settings-option" onclick="alert('Update email feature not implemented yet.')">Update Email...</div>
         <div class="settings-option" onclick="alert('Change password feature not implemented yet.')">Change Password...</div>
         <div class="settings-option logout-button" onclick="window.location.href='/logout'">Log Out...</div>
     </div>
     <script>
+        // Settings not shown on this page are sent back unchanged
+        const voiceCommand = {{ 'true' if preferences.voice_command else 'false' }};
+
         function toggleDarkMode() {
             const darkModeEnabled = document.getElementById('dark_mode').checked;
             document.body.style.backgroundColor = darkModeEnabled ? '#333' : '#a9a9a9';
             document.body.style.color = darkModeEnabled ? 'white' : 'black';
-            localStorage.setItem('dark_mode', darkModeEnabled);
         }
 
         function updateTextSize() {
             const textSize = document.getElementById('text_size').value;
             document.body.style.fontSize = textSize;
-            localStorage.setItem('text_size', textSize);
+        }
+
+        function saveSettings() {
+            const body = new URLSearchParams({ text_size: document.getElementById('text_size').value });
+            if (document.getElementById('dark_mode').checked) {
+                body.set('dark_mode', 'on');
+            }
+            if (voiceCommand) {
+                body.set('voice_command', 'on');
+            }
+            fetch('/update-settings', { method: 'POST', body: body })
+                .then(response => {
+                    if (!response.ok) {
+                        alert('Could not save your settings. Please try again.');
+                    }
+                });
         }
 
         document.addEventListener('DOMContentLoaded', () => {
-            const darkModeEnabled = localStorage.getItem('dark_mode') === 'true';
-            document.getElementById('dark_mode').checked = darkModeEnabled;
             toggleDarkMode();
-
-            const textSize = localStorage.getItem('text_size') || 'medium';
-            document.getElementById('text_size').value = textSize;
             updateTextSize();
         });
     </script>
@@ -747,27 +2354,329 @@ settings_page_template = """
 save_template('settings.html', settings_page_template)
 # =====================================
 
+# Fingerprinted asset bundles: logical name -> hashed filename, and hashed filename
+# -> {content-encoding: bytes}. Every variant is compressed once at startup.
+ASSET_MANIFEST = {}
+ASSET_FILES = {}
+ASSET_DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+def build_assets():
+    for name, content in ASSETS.items():
+        data = content.encode('utf-8')
+        stem, ext = os.path.splitext(name)
+        filename = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+        variants = {'identity': data, 'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['br'] = brotli.compress(data, quality=11)
+        ASSET_MANIFEST[name] = filename
+        ASSET_FILES[filename] = variants
+
+build_assets()
+
+# In files mode the bundles are also written under static/dist (with .gz/.br
+# siblings) so a front-end server can serve them without going through Flask
+def install_assets(app):
+    if app.config['TEMPLATE_MODE'] != 'memory':
+        os.makedirs(ASSET_DIST_DIR, exist_ok=True)
+        suffixes = {'identity': '', 'gzip': '.gz', 'br': '.br'}
+        for filename, variants in ASSET_FILES.items():
+            for encoding, data in variants.items():
+                write_if_changed(os.path.join(ASSET_DIST_DIR, filename + suffixes[encoding]), data)
+
+# Changes whenever a deploy changes the templates or asset bundles, so cached pages
+# rendered by an older release never validate
+RENDER_VERSION = hashlib.sha256(json.dumps([TEMPLATES, ASSET_MANIFEST], sort_keys=True).encode()).hexdigest()[:12]
+
+@bp.app_template_global()
+def asset_url(name):
+    return '/assets/' + ASSET_MANIFEST[name]
+
+# Serve a bundle, picking the best precompressed variant the client accepts. The
+# filename changes whenever the content does, so responses can be cached forever.
+@bp.route('/assets/<filename>')
+def asset(filename):
+    variants = ASSET_FILES.get(filename)
+    if variants is None:
+        abort(404)
+    encoding = request.accept_encodings.best_match([enc for enc in ('br', 'gzip') if enc in variants], default='identity')
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = current_app.response_class(variants[encoding], mimetype=mimetype)
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = ASSET_CACHE_CONTROL
+    response.set_etag(f'{filename}-{encoding}')
+    return response.make_conditional(request)
+
+# The logged-in user as seen by views: a plain tuple, safe to share between requests
+CurrentUser = namedtuple('CurrentUser', ['id', 'username'])
+
+# Small LRU cache with a TTL, mapping user id -> CurrentUser
+class UserCache:
+    def __init__(self):
+        self.maxsize = None
+        self.ttl = None
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config['USER_CACHE_SIZE']
+        self.ttl = app.config['USER_CACHE_TTL']
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._items.get(user_id)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._items[user_id]
+                return None
+            self._items.move_to_end(user_id)
+            return user
+
+    def set(self, user):
+        with self._lock:
+            self._items[user.id] = (user, time.monotonic() + self.ttl)
+            self._items.move_to_end(user.id)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._items.pop(user_id, None)
+
+user_cache = UserCache()
+
+# Per-worker LRU cache of user id -> (data version, Preferences). Writes go to the
+# database and then the cache; an entry is only used while its version matches the
+# user's current version, so a change made through another worker (which bumps the
+# version) is picked up on the next request.
+class PreferencesCache:
+    def __init__(self):
+        self.maxsize = None
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config['PREFERENCES_CACHE_SIZE']
+
+    def get(self, user_id, version):
+        with self._lock:
+            entry = self._items.get(user_id)
+            if entry is None or entry[0] != version:
+                return None
+            self._items.move_to_end(user_id)
+            return entry[1]
+
+    def set(self, user_id, version, preferences):
+        with self._lock:
+            self._items[user_id] = (version, preferences)
+            self._items.move_to_end(user_id)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+preferences_cache = PreferencesCache()
+
+# Preferences for the given user at the given data version; only a cache miss reads
+# the database
+def load_preferences(user_id, version):
+    preferences = preferences_cache.get(user_id, version)
+    if preferences is None:
+        stmt = select(UserPreferences).where(UserPreferences.user_id == user_id)
+        row = db.session.execute(stmt, bind_arguments={'bind': read_engine()}).scalar_one_or_none()
+        preferences = preferences_from_row(row)
+        preferences_cache.set(user_id, version, preferences)
+    return preferences
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def invalidate_cached_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
+
+def load_current_user(user_id):
+    user = user_cache.get(user_id)
+    if user is None:
+        row = db.session.get(User, user_id)
+        if row is None:
+            return None
+        user = CurrentUser(row.id, row.username)
+        user_cache.set(user)
+    return user
+
+# Redirects to the login page unless the session belongs to an existing user, whom
+# it makes available to the view as g.user
+def login_required(view):
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        user_id = session.get('user_id')
+        user = load_current_user(user_id) if user_id is not None else None
+        if user is None:
+            session.pop('user_id', None)
+            return redirect(url_for('main.login'))
+        g.user = user
+        return view(*args, **kwargs)
+    return wrapped
+
+# Poster derivatives: resized, recompressed copies of the images under static/,
+# generated on demand and cached on disk under a key derived from the source
+# file's content hash, the width, format and quality
+POSTER_FORMATS = {'webp': ('WEBP', 'image/webp'), 'jpeg': ('JPEG', 'image/jpeg')}
+POSTER_MAX_AGE = 24 * 60 * 60
+
+# SHA-256 of a file's content, recomputed only when its size or mtime changes
+@lru_cache(maxsize=4096)
+def file_digest(path, size, mtime_ns):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class PosterRenderer(PerProcess):
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._executor = None
+        # Builds in progress, so concurrent requests for one variant share the work
+        self._pending = {}
+
+    def _start(self):
+        self._executor = ThreadPoolExecutor(max_workers=current_app.config['POSTER_WORKERS'], thread_name_prefix='poster')
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = {}
+
+    # Path of the cached variant, building it first if needed
+    def get(self, source_path, width, fmt):
+        stat = os.stat(source_path)
+        quality = current_app.config['POSTER_QUALITY']
+        key_source = f'{file_digest(source_path, stat.st_size, stat.st_mtime_ns)}:{width}:{fmt}:{quality}'
+        key = hashlib.sha256(key_source.encode()).hexdigest()[:32]
+        target_path = os.path.join(current_app.config['POSTER_CACHE_DIR'], key[:2], f'{key}.{fmt}')
+        if os.path.exists(target_path):
+            return target_path
+
+        self._ensure_started()
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = self._executor.submit(self._render, source_path, target_path, width, fmt, quality)
+                self._pending[key] = future
+                future.add_done_callback(lambda _: self._pending.pop(key, None))
+        future.result()
+        return target_path
+
+    @staticmethod
+    def _render(source_path, target_path, width, fmt, quality):
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        with Image.open(source_path) as image:
+            image.draft('RGB', (width, width * 4))  # lets JPEG decode at reduced size
+            if image.width > width:
+                image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+            if fmt == 'jpeg' and image.mode != 'RGB':
+                image = image.convert('RGB')
+            tmp_path = f'{target_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            image.save(tmp_path, POSTER_FORMATS[fmt][0], quality=quality, optimize=fmt == 'jpeg')
+        os.replace(tmp_path, target_path)
+
+poster_renderer = PosterRenderer()
+
+def poster_url(image_url, width):
+    if image_url and image_url.startswith('/static/'):
+        return f'/posters/{width}/{image_url[len("/static/"):]}'
+    return image_url
+
+@bp.app_template_global()
+def poster_srcset(image_url):
+    if not image_url or not image_url.startswith('/static/'):
+        return ''
+    return ', '.join(f'{poster_url(image_url, width)} {width}w' for width in current_app.config['POSTER_WIDTHS'])
+
+@bp.route('/posters/<int:width>/<path:filename>')
+def poster(width, filename):
+    if width not in current_app.config['POSTER_WIDTHS']:
+        abort(404)
+    source_path = safe_join(current_app.static_folder, filename)
+    if source_path is None or not os.path.isfile(source_path):
+        abort(404)
+    if Image is None:
+        return send_from_directory(current_app.static_folder, filename, max_age=POSTER_MAX_AGE)
+    fmt = 'webp' if any(value == 'image/webp' for value, _ in request.accept_mimetypes) else 'jpeg'
+    try:
+        target_path = poster_renderer.get(source_path, width, fmt)
+    except OSError:
+        # Not an image Pillow can read; serve the original as-is
+        return send_from_directory(current_app.static_folder, filename, max_age=POSTER_MAX_AGE)
+    response = send_file(target_path, mimetype=POSTER_FORMATS[fmt][1], max_age=POSTER_MAX_AGE)
+    response.vary.add('Accept')
+    return response
+
+# Conditional GET for per-user pages. The ETag is derived from the user's data version,
+# the catalog content and the release, so a matching If-None-Match (or an unchanged
+# If-Modified-Since) gets a 304 without rendering the template.
+def page_validators(page, user_id, version, updated_at):
+    tag = f'{page}:{user_id}:{version}:{catalog.digest}:{RENDER_VERSION}'
+    etag = hashlib.sha1(tag.encode()).hexdigest()[:20]
+    last_modified = max(filter(None, [updated_at, catalog_loaded_at]))
+    return etag, last_modified
+
+def conditional_page(page, render):
+    version, updated_at = get_user_version(g.user.id)
+    # Lets render() look up version-checked data such as the user's preferences
+    g.user_version = version
+    etag, last_modified = page_validators(page, g.user.id, version, updated_at)
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    else:
+        not_modified = request.if_modified_since is not None and last_modified.replace(microsecond=0) <= request.if_modified_since
+    response = current_app.response_class(status=304) if not_modified else make_response(render())
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
 # Flask routes to handle the UI navigation and functionality
-@app.route('/')
+@bp.app_errorhandler(HashingBusy)
+def hashing_busy(error):
+    return "The server is busy. Please try again in a moment.", 503, {'Retry-After': '1'}
+
+@bp.route('/')
+@login_required
 def home():
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
-    return render_template('home.html', recommendations=user_data['recommendations'], preferences=user_data['preferences'])
+    def render():
+        shows, next_cursor = catalog.page(limit=1)
+        show = shows[0] if shows else None
+        preferences = load_preferences(g.user.id, g.user_version)
+        return render_template('home.html', show=show, next_cursor=next_cursor, preferences=preferences)
+    return conditional_page('home', render)
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
         user = User.query.filter_by(username=username).first()
-        if user and check_password_hash(user.password, password):
+        if user and password_hasher.verify(user.password, password):
+            # Transparently upgrade hashes made with an older method or cost
+            if password_hasher.needs_rehash(user.password):
+                try:
+                    user.password = password_hasher.hash(password)
+                    db.session.commit()
+                except HashingBusy:
+                    pass
             session['user_id'] = user.id
-            return redirect(url_for('home'))
+            return redirect(url_for('main.home'))
         else:
             return "Invalid username or password. Please try again."
     return render_template('login.html')
 
-@app.route('/signup', methods=['GET', 'POST'])
+@bp.route('/signup', methods=['GET', 'POST'])
 def signup():
     if request.method == 'POST':
         try:
@@ -781,71 +2690,297 @@ def signup():
             if password != confirm_password:
                 return "Passwords do not match. Please try again."
 
-            existing_user = User.query.filter_by(username=username).first()
-            if existing_user:
-                return "Username already exists. Please choose a different one."
-
-            hashed_password = generate_password_hash(password)
+            hashed_password = password_hasher.hash(password)
             new_user = User(username=username, password=hashed_password)
             db.session.add(new_user)
-            db.session.commit()
+            # The unique constraint on username decides between concurrent signups. The
+            # id is read before the commit, which expires the object.
+            try:
+                db.session.flush()
+                user_id = new_user.id
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                return "Username already exists. Please choose a different one."
 
-            # Log credentials to a file
-            log_credentials(username, password)
+            audit_log.record('signup', user_id=user_id, username=username, remote_addr=request.remote_addr)
 
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
+        except HashingBusy:
+            raise
         except Exception as e:
             logging.error(f"Error during signup: {e}")
             return "An error occurred during signup. Please try again later."
     return render_template('signup.html')
 
-@app.route('/logout')
+@bp.route('/logout')
 def logout():
-    session.pop('user_id', None)
-    return redirect(url_for('login'))
+    user_id = session.pop('user_id', None)
+    if user_id is not None:
+        user_cache.invalidate(user_id)
+    return redirect(url_for('main.login'))
 
-@app.route('/watchlist')
+@bp.route('/watchlist')
+@login_required
 def watchlist():
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
-    return render_template('watchlist.html', watchlist=user_data['watchlist'])
+    def render():
+        show_ids, next_cursor = watchlist_page(g.user.id)
+        shows = (catalog.get(show_id) for show_id in show_ids)
+        preferences = load_preferences(g.user.id, g.user_version)
+        return render_template('watchlist.html', watchlist=[show for show in shows if show], next_cursor=next_cursor,
+                               page_size=WATCHLIST_PAGE_SIZE, preferences=preferences)
+    return conditional_page('watchlist', render)
+
+# Watchlist feed for scrolling past the first page: /api/watchlist?after=<cursor>&limit=50
+@bp.route('/api/watchlist')
+@login_required
+def watchlist_feed():
+    cursor = request.args.get('after')
+    try:
+        after = decode_watchlist_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({'message': 'Invalid cursor.'}), 400
+    limit = request.args.get('limit', default=WATCHLIST_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, WATCHLIST_PAGE_MAX))
+
+    def render():
+        show_ids, next_cursor = watchlist_page(g.user.id, after, limit)
+        shows = (catalog.get(show_id) for show_id in show_ids)
+        return jsonify({'shows': [show for show in shows if show], 'next': next_cursor})
+    return conditional_page(f'watchlist-feed:{cursor}:{limit}', render)
 
-@app.route('/settings')
+@bp.route('/settings')
+@login_required
 def settings():
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
-    return render_template('settings.html', preferences=user_data['preferences'])
+    def render():
+        return render_template('settings.html', preferences=load_preferences(g.user.id, g.user_version))
+    return conditional_page('settings', render)
+
+# Recommendations feed, paginated by show id: /api/recommendations?after=<id>&limit=20
+RECOMMENDATIONS_PAGE_MAX = 100
+
+@bp.route('/api/recommendations')
+@login_required
+def recommendations_feed():
+    after = request.args.get('after', type=int)
+    limit = request.args.get('limit', default=20, type=int)
+    limit = max(1, min(limit, RECOMMENDATIONS_PAGE_MAX))
+    # Pages only change when the catalog does
+    etag = f'feed-{catalog.digest}-{after}-{limit}'
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        shows, next_cursor = catalog.page(after=after, limit=limit)
+        response = jsonify({'shows': shows, 'next': next_cursor})
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+# Catalog search with prefix matching for type-ahead: /api/search?q=breaking+ba&limit=10
+SEARCH_LIMIT_MAX = 50
+
+@bp.route('/api/search')
+@login_required
+def search():
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', default=10, type=int)
+    limit = max(1, min(limit, SEARCH_LIMIT_MAX))
+    return jsonify({'shows': search_shows(query, limit)})
+
+# Best-ranked shows for the current user, driven by their watchlist and swipes
+@bp.route('/api/recommendations/top')
+@login_required
+def top_recommendations():
+    limit = request.args.get('limit', default=20, type=int)
+    limit = max(1, min(limit, RECOMMENDATIONS_PAGE_MAX))
+    liked_ids, disliked_ids = swipe_history(g.user.id)
+    liked_ids.update(watchlist_show_ids(g.user.id))
+    shows = recommendation_engine.recommend(liked_ids=liked_ids, disliked_ids=disliked_ids,
+                                            exclude_ids=liked_ids | disliked_ids, k=limit)
+    return jsonify({'shows': shows})
+
+# Record a like/dislike. Only appends to the swipe buffer; the write happens later.
+@bp.route('/swipe', methods=['POST'])
+@login_required
+def swipe():
+    data = request.get_json(silent=True) if request.is_json else request.form
+    if not isinstance(data, Mapping):
+        return jsonify({'message': 'Expected a JSON object or form data.'}), 400
+    try:
+        show_id = int(data.get('show_id'))
+    except (TypeError, ValueError):
+        return jsonify({'message': 'Show not found.'}), 400
+    if show_id not in catalog:
+        return jsonify({'message': 'Show not found.'}), 404
+    liked = data.get('liked') in (True, 'true', '1', 'on')
+    swipe_buffer.append(g.user.id, show_id, liked)
+    return jsonify({'message': 'Swipe recorded.'}), 202
 
-@app.route('/add-to-watchlist/<int:show_id>', methods=['POST'])
+@bp.route('/add-to-watchlist/<int:show_id>', methods=['POST'])
+@login_required
 def add_to_watchlist(show_id):
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
-    show = next((rec for rec in user_data['recommendations'] if rec['id'] == show_id), None)
-    if show and show not in user_data['watchlist']:
-        user_data['watchlist'].append(show)
+    show = catalog.get(show_id)
+    if show and add_watchlist_entries(g.user.id, [show_id]):
+        bump_user_version(g.user.id)
+        db.session.commit()
         return jsonify({'message': f'{show["title"]} added to watchlist.'})
     return jsonify({'message': 'Show not found or already in watchlist.'})
 
-@app.route('/remove-from-watchlist/<int:show_id>', methods=['POST'])
+@bp.route('/remove-from-watchlist/<int:show_id>', methods=['POST'])
+@login_required
 def remove_from_watchlist(show_id):
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
-    show = next((item for item in user_data['watchlist'] if item['id'] == show_id), None)
-    if show:
-        user_data['watchlist'].remove(show)
-        return jsonify({'message': f'{show["title"]} removed from watchlist.'})
+    if remove_watchlist_entries(g.user.id, [show_id]):
+        bump_user_version(g.user.id)
+        db.session.commit()
+        show = catalog.get(show_id)
+        title = show['title'] if show else 'Show'
+        return jsonify({'message': f'{title} removed from watchlist.'})
     return jsonify({'message': 'Show not found in watchlist.'})
 
-@app.route('/update-settings', methods=['POST'])
+# Apply a list of watchlist operations in one transaction:
+#   {"operations": [{"op": "add", "show_id": 1}, {"op": "remove", "show_id": 2},
+#                   {"op": "swipe", "show_id": 3, "liked": false}]}
+# Operations are applied in order and each gets the same message the single-item
+# routes would return. The database sees one SELECT, one INSERT and one DELETE;
+# swipes go to the swipe buffer like /swipe.
+WATCHLIST_BATCH_MAX = 200
+
+@bp.route('/watchlist/batch', methods=['POST'])
+@login_required
+def watchlist_batch():
+    data = request.get_json(silent=True)
+    operations = data.get('operations') if isinstance(data, Mapping) else None
+    if not isinstance(operations, list) or len(operations) > WATCHLIST_BATCH_MAX:
+        return jsonify({'message': f'Expected a list of at most {WATCHLIST_BATCH_MAX} operations.'}), 400
+
+    parsed = []
+    for operation in operations:
+        try:
+            op, show_id, liked = operation.get('op'), int(operation.get('show_id')), operation.get('liked')
+        except (AttributeError, TypeError, ValueError):
+            parsed.append((None, None, None))
+            continue
+        # An id SQLite can't store can't be on the watchlist either; it's kept out of
+        # the query, and the operation fails as for any show that isn't there
+        parsed.append((op, show_id if 0 < show_id <= SQLITE_MAX_INTEGER else None, liked))
+
+    before = watchlist_members(g.user.id, {show_id for op, show_id, _ in parsed if op in ('add', 'remove') and show_id is not None})
+    after = set(before)
+    added = []
+    swipes = []
+    results = []
+    for op, show_id, liked in parsed:
+        show = catalog.get(show_id)
+        if op == 'swipe':
+            ok = show is not None
+            message = 'Swipe recorded.' if ok else 'Show not found.'
+            if ok:
+                swipes.append((show_id, liked in (True, 'true', '1', 'on')))
+        elif op == 'add':
+            ok = show is not None and show_id not in after
+            message = f'{show["title"]} added to watchlist.' if ok else 'Show not found or already in watchlist.'
+            if ok:
+                after.add(show_id)
+                added.append(show_id)
+        elif op == 'remove':
+            ok = show_id in after
+            title = show['title'] if show else 'Show'
+            message = f'{title} removed from watchlist.' if ok else 'Show not found in watchlist.'
+            after.discard(show_id)
+        else:
+            ok, message = False, 'Unknown operation.'
+        results.append({'op': op, 'show_id': show_id, 'ok': ok, 'message': message})
+
+    # Keep the order shows were added in; an add that was later removed is dropped
+    changed = add_watchlist_entries(g.user.id, [show_id for show_id in dict.fromkeys(added) if show_id in after and show_id not in before])
+    changed += remove_watchlist_entries(g.user.id, before - after)
+    if changed:
+        bump_user_version(g.user.id)
+    db.session.commit()
+    for show_id, liked in swipes:
+        swipe_buffer.append(g.user.id, show_id, liked)
+    return jsonify({'results': results})
+
+@bp.route('/update-settings', methods=['POST'])
+@login_required
 def update_settings():
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
-    user_data['preferences']['dark_mode'] = request.form.get('dark_mode') == 'on'
-    user_data['preferences']['text_size'] = request.form.get('text_size', 'medium')
-    user_data['preferences']['voice_command'] = request.form.get('voice_command') == 'on'
+    text_size = request.form.get('text_size', 'medium')
+    if text_size not in TEXT_SIZES:
+        return jsonify({'message': 'Invalid text size.'}), 400
+    preferences = Preferences(dark_mode=request.form.get('dark_mode') == 'on',
+                              text_size=text_size,
+                              voice_command=request.form.get('voice_command') == 'on')
+    save_preferences(g.user.id, preferences)
+    version = bump_user_version(g.user.id)
+    db.session.commit()
+    preferences_cache.set(g.user.id, version, preferences)
     return jsonify({'message': 'Settings updated successfully.'})
 
+# Prometheus scrape endpoint. The numbers are per worker process.
+@bp.route('/metrics')
+def metrics():
+    token = current_app.config['METRICS_TOKEN']
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        abort(403)
+    return metrics_registry.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+# Application factory. Builds the Flask app from the default configuration plus the
+# given overrides, binds the database and the per-process services to it, installs
+# the templates and assets, and warms the app up.
+def create_app(config=None):
+    app = Flask(__name__)
+    load_config(app)
+    app.config.from_mapping(config or {})
+    configure_logging(app)
+    configure_database(app)
+    db.init_app(app)
+    with app.app_context():
+        attach_engine_listeners(app)
+    for service in (request_profiler, swipe_buffer, audit_log, password_hasher, user_cache, preferences_cache):
+        service.init_app(app)
+    configure_search_cache(app)
+    install_templates(app)
+    install_assets(app)
+    app.register_blueprint(bp)
+    warm_up(app)
+    return app
+
+# Everything the first requests of a worker would otherwise pay for: the catalog and
+# its search index, the recommendation matrix and compiled templates. The tables must
+# already exist (flask init-db); if they don't, the catalog is loaded by the first
+# request instead. Under a preloading server (see gunicorn.conf.py) this runs once in
+# the master, and the forked workers share the result copy-on-write.
+def warm_up(app):
+    with app.app_context():
+        # Always reload rather than trusting catalog_loaded: the catalog is shared by
+        # the module, and may have been loaded from another app's database
+        with catalog_load_lock:
+            if load_catalog():
+                catalog_loaded.set()
+            else:
+                catalog_loaded.clear()
+        recommendation_engine.scores()
+        for name in TEMPLATES:
+            app.jinja_env.get_template(name)
+        # Workers must not share the master's database connections
+        engines = list(db.engines.values())
+        for engine in engines:
+            engine.dispose()
+
+    def reset_engines_after_fork():
+        for engine in engines:
+            engine.dispose(close=False)
+    os.register_at_fork(after_in_child=reset_engines_after_fork)
+
+    # Move everything allocated so far out of the collector's reach, so collections in
+    # the workers don't write to (and so copy) the pages shared with the master
+    gc.collect()
+    gc.freeze()
+
 # Run the app
 if __name__ == '__main__':
-    db.create_all()
+    app = create_app()
+    with app.app_context():
+        db.create_all()
     app.run(debug=True)
@@ -0,0 +1,250 @@
+import os
+import asyncio
+import contextlib
+import logging
+import time
+from datetime import timezone
+from itsdangerous import BadSignature
+from sqlalchemy import event, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import HTMLResponse, RedirectResponse, Response
+from starlette.routing import Mount, Route
+from werkzeug.http import http_date, parse_date, parse_etags
+from werkzeug.security import check_password_hash, generate_password_hash
+from a2wsgi import WSGIMiddleware
+from flask import render_template
+
+from app import (create_app, db, User, UserVersion, UserPreferences, CurrentUser, HashingBusy, catalog,
+                 user_cache, preferences_cache, preferences_from_row, password_hasher, audit_log, page_validators,
+                 watchlist_page_stmt, split_watchlist_page, WATCHLIST_PAGE_SIZE,
+                 ensure_catalog_loaded, sqlite_pragma_listener, sql_timing_listeners,
+                 REQUESTS_IN_FLIGHT, REQUESTS_TOTAL, REQUEST_LATENCY)
+
+# Optional async serving mode, run under an ASGI server:
+#
+#     uvicorn asgi:application --workers 4
+#
+# Login, signup and the watchlist page are served by async views that query through an
+# async SQLAlchemy engine and wait on password hashes without blocking the event loop.
+# Every other route is passed to the Flask app, which keeps working unchanged under WSGI.
+# Needs starlette, python-multipart, a2wsgi, aiosqlite and SQLAlchemy's asyncio extra (greenlet).
+# Create the tables first with `flask --app app init-db`.
+
+app = create_app()
+
+# Async driver URL for the app's database. SQLite databases are opened through aiosqlite;
+# other databases need ASYNC_DATABASE_URL (e.g. postgresql+asyncpg://...)
+def async_database_url():
+    if os.environ.get('ASYNC_DATABASE_URL'):
+        return os.environ['ASYNC_DATABASE_URL']
+    with app.app_context():
+        url = db.engine.url
+    if url.get_backend_name() != 'sqlite':
+        raise RuntimeError('Set ASYNC_DATABASE_URL to an async driver URL for this database')
+    return url.set(drivername='sqlite+aiosqlite').render_as_string(hide_password=False)
+
+database_url = async_database_url()
+async_engine = create_async_engine(database_url, **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+if make_url(database_url).get_backend_name() == 'sqlite':
+    event.listen(async_engine.sync_engine, 'connect', sqlite_pragma_listener(app.config['SQLITE_PRAGMAS'], False))
+for name, listener in zip(('before_cursor_execute', 'after_cursor_execute'), sql_timing_listeners('async')):
+    event.listen(async_engine.sync_engine, name, listener)
+async_session = async_sessionmaker(async_engine, expire_on_commit=False)
+
+# Flask's signed session cookie, so a login here is seen by the WSGI routes and back
+session_serializer = app.session_interface.get_signing_serializer(app)
+
+def load_session(request):
+    value = request.cookies.get(app.config['SESSION_COOKIE_NAME'])
+    if not value:
+        return {}
+    try:
+        return dict(session_serializer.loads(value, max_age=int(app.permanent_session_lifetime.total_seconds())))
+    except BadSignature:
+        return {}
+
+def save_session(response, data):
+    response.set_cookie(
+        app.config['SESSION_COOKIE_NAME'],
+        session_serializer.dumps(data),
+        path=app.config['SESSION_COOKIE_PATH'] or app.config['APPLICATION_ROOT'],
+        domain=app.config['SESSION_COOKIE_DOMAIN'],
+        secure=app.config['SESSION_COOKIE_SECURE'],
+        httponly=app.config['SESSION_COOKIE_HTTPONLY'],
+        samesite=app.config['SESSION_COOKIE_SAMESITE'],
+    )
+
+# Runs a hashing function in the app's hashing pool and awaits the result
+async def run_hash(fn, *args):
+    future = password_hasher.submit(fn, *args)
+    if future is None:
+        return await run_in_threadpool(fn, *args)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), app.config['PASSWORD_HASH_TIMEOUT'])
+    except asyncio.TimeoutError:
+        raise HashingBusy()
+
+# Templates are rendered by Flask's Jinja environment, so the pages are identical
+def render_page(template, **context):
+    with app.app_context():
+        return render_template(template, **context)
+
+async def load_current_user(db_session, user_id):
+    if user_id is None:
+        return None
+    user = user_cache.get(user_id)
+    if user is None:
+        row = await db_session.get(User, user_id)
+        if row is None:
+            return None
+        user = CurrentUser(row.id, row.username)
+        user_cache.set(user)
+    return user
+
+# Same check as the WSGI conditional_page()
+def not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match:
+        return parse_etags(if_none_match).contains(etag)
+    if_modified_since = parse_date(request.headers.get('if-modified-since'))
+    return if_modified_since is not None and last_modified.replace(microsecond=0) <= if_modified_since
+
+# Records the same request metrics as the Flask hooks, under the Flask endpoint names
+def instrumented(endpoint, view):
+    async def wrapped(request):
+        REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await view(request)
+            status = response.status_code
+            return response
+        except HashingBusy:
+            status = 503
+            raise
+        finally:
+            REQUESTS_IN_FLIGHT.inc(-1)
+            REQUESTS_TOTAL.inc(labels=(endpoint, request.method, str(status)))
+            REQUEST_LATENCY.observe(time.perf_counter() - started, (endpoint, request.method))
+    return wrapped
+
+async def login(request):
+    if request.method == 'POST':
+        form = await request.form()
+        username = form.get('username')
+        password = form.get('password')
+        async with async_session() as db_session:
+            user = (await db_session.execute(select(User).where(User.username == username))).scalars().first()
+            if user and await run_hash(check_password_hash, user.password, password):
+                # Transparently upgrade hashes made with an older method or cost
+                if password_hasher.needs_rehash(user.password):
+                    try:
+                        user.password = await run_hash(generate_password_hash, password, app.config['PASSWORD_HASH_METHOD'])
+                        await db_session.commit()
+                    except HashingBusy:
+                        pass
+                session = load_session(request)
+                session['user_id'] = user.id
+                response = RedirectResponse('/', status_code=302)
+                save_session(response, session)
+                return response
+        return HTMLResponse("Invalid username or password. Please try again.")
+    return HTMLResponse(render_page('login.html'))
+
+async def signup(request):
+    if request.method == 'POST':
+        try:
+            form = await request.form()
+            username = form.get('username')
+            password = form.get('password')
+            confirm_password = form.get('confirm_password')
+
+            if not username or not password or not confirm_password:
+                return HTMLResponse("All fields are required. Please try again.")
+
+            if password != confirm_password:
+                return HTMLResponse("Passwords do not match. Please try again.")
+
+            hashed_password = await run_hash(generate_password_hash, password, app.config['PASSWORD_HASH_METHOD'])
+            async with async_session() as db_session:
+                new_user = User(username=username, password=hashed_password)
+                db_session.add(new_user)
+                # The unique constraint on username decides between concurrent signups
+                try:
+                    await db_session.commit()
+                except IntegrityError:
+                    await db_session.rollback()
+                    return HTMLResponse("Username already exists. Please choose a different one.")
+
+            audit_log.record('signup', user_id=new_user.id, username=username,
+                             remote_addr=request.client.host if request.client else None)
+
+            return RedirectResponse('/login', status_code=302)
+        except HashingBusy:
+            raise
+        except Exception as e:
+            logging.error(f"Error during signup: {e}")
+            return HTMLResponse("An error occurred during signup. Please try again later.")
+    return HTMLResponse(render_page('signup.html'))
+
+async def watchlist(request):
+    session = load_session(request)
+    async with async_session() as db_session:
+        user = await load_current_user(db_session, session.get('user_id'))
+        if user is None:
+            response = RedirectResponse('/login', status_code=302)
+            if session.pop('user_id', None) is not None:
+                save_session(response, session)
+            return response
+
+        stmt = select(UserVersion.version, UserVersion.updated_at).where(UserVersion.user_id == user.id)
+        row = (await db_session.execute(stmt)).first()
+        version, updated_at = (row.version, row.updated_at.replace(tzinfo=timezone.utc)) if row else (0, None)
+        etag, last_modified = page_validators('watchlist', user.id, version, updated_at)
+        if not_modified(request, etag, last_modified):
+            response = Response(status_code=304)
+        else:
+            rows = (await db_session.execute(watchlist_page_stmt(user.id, None, WATCHLIST_PAGE_SIZE))).all()
+            show_ids, next_cursor = split_watchlist_page(rows, WATCHLIST_PAGE_SIZE)
+            shows = (catalog.get(show_id) for show_id in show_ids)
+            preferences = preferences_cache.get(user.id, version)
+            if preferences is None:
+                preferences = preferences_from_row(await db_session.get(UserPreferences, user.id))
+                preferences_cache.set(user.id, version, preferences)
+            response = HTMLResponse(render_page('watchlist.html', watchlist=[show for show in shows if show],
+                                                next_cursor=next_cursor, page_size=WATCHLIST_PAGE_SIZE,
+                                                preferences=preferences))
+    response.headers['ETag'] = f'"{etag}"'
+    response.headers['Last-Modified'] = http_date(last_modified)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+async def hashing_busy(request, error):
+    return HTMLResponse("The server is busy. Please try again in a moment.", status_code=503, headers={'Retry-After': '1'})
+
+# create_app() has normally loaded the catalog already; this covers tables that were
+# only created after the import, as Flask's before_request hook does for WSGI routes
+def warm_up():
+    with app.app_context():
+        ensure_catalog_loaded()
+
+@contextlib.asynccontextmanager
+async def lifespan(_):
+    await run_in_threadpool(warm_up)
+    yield
+    await async_engine.dispose()
+
+application = Starlette(
+    routes=[
+        Route('/login', instrumented('main.login', login), methods=['GET', 'POST']),
+        Route('/signup', instrumented('main.signup', signup), methods=['GET', 'POST']),
+        Route('/watchlist', instrumented('main.watchlist', watchlist), methods=['GET']),
+        Mount('/', app=WSGIMiddleware(app)),
+    ],
+    exception_handlers={HashingBusy: hashing_busy},
+    lifespan=lifespan,
+)
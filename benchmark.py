@@ -0,0 +1,317 @@
+# Route-level latency benchmark for app.py
+#
+# Seeds a synthetic catalog and user base into a throwaway SQLite database, then
+# drives every route in-process through the Flask test client and/or over HTTP from
+# a concurrent load generator against a local server. Reports throughput and
+# p50/p95/p99 latency per route for each catalog/watchlist size, writes the results
+# to JSON, and fails if a stored baseline regressed beyond the threshold.
+#
+#   python benchmark.py --catalog-sizes 1000,100000 --watchlist-sizes 0,500
+#   python benchmark.py --output bench.json --baseline bench-baseline.json --threshold 0.25
+#   python benchmark.py --output bench-baseline.json   # record a new baseline
+import argparse
+import http.client
+import itertools
+import json
+import logging
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+ROUTES = ['login_page', 'login', 'signup', 'home', 'watchlist', 'add_to_watchlist', 'remove_from_watchlist', 'update_settings']
+BENCH_PASSWORD = 'benchmark-password'
+GENRES = ['Anime', 'Drama', 'Science Fiction', 'Comedy', 'Horror', 'Documentary', 'Thriller', 'Romance']
+
+def parse_sizes(value):
+    return [int(size) for size in value.split(',') if size.strip()]
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Route-level latency benchmark for app.py')
+    parser.add_argument('--catalog-sizes', type=parse_sizes, default=[1000, 20000])
+    parser.add_argument('--watchlist-sizes', type=parse_sizes, default=[0, 200])
+    parser.add_argument('--users', type=int, default=20, help='Seeded users per scenario.')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per route and scenario.')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients in load mode.')
+    parser.add_argument('--mode', choices=['inprocess', 'load', 'both'], default='both')
+    parser.add_argument('--routes', type=lambda value: value.split(','), default=ROUTES)
+    parser.add_argument('--hash-method', help='Override PASSWORD_HASH_METHOD (e.g. a cheaper one to focus on the app itself).')
+    parser.add_argument('--output', default='bench-results.json')
+    parser.add_argument('--baseline', help='Results file to compare against.')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed relative regression (0.2 = 20%%).')
+    parser.add_argument('--seed', type=int, default=1234)
+    return parser.parse_args(argv)
+
+# Import app.py and create an app against a scratch database. Everything else the
+# app writes goes to the scratch directory too, not the repository's instance/.
+def import_app(workdir, args):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as app_module
+    config = {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(workdir, 'bench.db'),
+        'TEMPLATE_MODE': os.environ.get('TEMPLATE_MODE', 'memory'),
+        'AUDIT_LOG_PATH': os.path.join(workdir, 'audit.log'),
+        'POSTER_CACHE_DIR': os.path.join(workdir, 'poster-cache'),
+        'PROFILE_DIR': os.path.join(workdir, 'profiles'),
+    }
+    if args.hash_method:
+        config['PASSWORD_HASH_METHOD'] = args.hash_method
+    flask_app = app_module.create_app(config)
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    return app_module, flask_app
+
+def seed(app_module, flask_app, catalog_size, watchlist_size, user_count, rng):
+    from sqlalchemy import insert, text
+    db = app_module.db
+    with flask_app.app_context():
+        db.drop_all()
+        db.session.execute(text('DROP TABLE IF EXISTS show_fts'))
+        db.session.commit()
+        db.create_all()
+        app_module.ensure_search_index()
+
+        shows = ({'id': show_id, 'title': f'Show {show_id}', 'genre': rng.choice(GENRES),
+                  'image_url': '/static/placeholder.jpg', 'rating': f'{rng.randint(1, 10)}/10',
+                  'description': f'Synthetic show number {show_id}.'}
+                 for show_id in range(1, catalog_size + 1))
+        while True:
+            chunk = list(itertools.islice(shows, 5000))
+            if not chunk:
+                break
+            app_module.upsert_shows(chunk)
+        db.session.commit()
+
+        # Every seeded user shares one precomputed hash, so seeding costs a single hash
+        password_hash = app_module.password_hasher.hash(BENCH_PASSWORD)
+        users = [{'id': user_id, 'username': f'bench{user_id}', 'password': password_hash}
+                 for user_id in range(1, user_count + 1)]
+        db.session.execute(insert(app_module.User), users)
+        watchlist_size = min(watchlist_size, catalog_size)
+        for user in users:
+            app_module.add_watchlist_entries(user['id'], rng.sample(range(1, catalog_size + 1), watchlist_size))
+        db.session.commit()
+
+        app_module.load_catalog()
+        app_module.catalog_loaded.set()
+        app_module.user_cache._items.clear()
+        app_module.preferences_cache._items.clear()
+    return users
+
+# Builds (method, path, form) for one request to the given route
+class RequestPlan:
+    def __init__(self, catalog_size, users, rng):
+        self.catalog_size = catalog_size
+        self.users = users
+        self.rng = rng
+        self.signups = itertools.count()
+        self.lock = threading.Lock()
+
+    def next(self, route, user):
+        if route == 'login_page':
+            return 'GET', '/login', None
+        if route == 'login':
+            return 'POST', '/login', {'username': user['username'], 'password': BENCH_PASSWORD}
+        if route == 'signup':
+            with self.lock:
+                username = f'signup-{os.getpid()}-{time.time_ns()}-{next(self.signups)}'
+            return 'POST', '/signup', {'username': username, 'password': BENCH_PASSWORD, 'confirm_password': BENCH_PASSWORD}
+        if route == 'home':
+            return 'GET', '/', None
+        if route == 'watchlist':
+            return 'GET', '/watchlist', None
+        if route in ('add_to_watchlist', 'remove_from_watchlist'):
+            # Random shows, so adds and removes roughly balance out and the watchlist
+            # size stays close to the seeded one
+            with self.lock:
+                show_id = self.rng.randint(1, self.catalog_size)
+            path = '/add-to-watchlist/' if route == 'add_to_watchlist' else '/remove-from-watchlist/'
+            return 'POST', f'{path}{show_id}', None
+        if route == 'update_settings':
+            return 'POST', '/update-settings', {'dark_mode': 'on', 'text_size': 'medium'}
+        raise ValueError(f'Unknown route {route!r}')
+
+# Nearest-rank percentile
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    to_ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'mean_ms': to_ms(sum(latencies) / len(latencies)) if latencies else None,
+        'p50_ms': to_ms(percentile(latencies, 0.50)),
+        'p95_ms': to_ms(percentile(latencies, 0.95)),
+        'p99_ms': to_ms(percentile(latencies, 0.99)),
+    }
+
+def is_error(route, status):
+    # Protected routes answer POSTs with JSON and pages with 200; login/signup redirect
+    return status >= 400 or (route not in ('login', 'signup') and status == 302)
+
+def run_inprocess(flask_app, plan, route, count):
+    clients = []
+    for user in plan.users:
+        client = flask_app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = user['id']
+        clients.append((client, user))
+
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for i in range(count):
+        client, user = clients[i % len(clients)]
+        method, path, form = plan.next(route, user)
+        request_started = time.perf_counter()
+        response = client.open(path, method=method, data=form)
+        latencies.append(time.perf_counter() - request_started)
+        errors += is_error(route, response.status_code)
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+# HTTP client for load mode: one keep-alive connection and session cookie per worker
+class HttpClient:
+    def __init__(self, port, user):
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        self.user = user
+        self.cookie = None
+        status, headers = self.request('POST', '/login', {'username': user['username'], 'password': BENCH_PASSWORD})
+        cookie = headers.get('Set-Cookie')
+        if cookie is None:
+            raise RuntimeError(f"Could not log in as {user['username']} (HTTP {status})")
+        self.cookie = cookie.split(';', 1)[0]
+
+    def request(self, method, path, form=None):
+        headers = {'Cookie': self.cookie} if self.cookie else {}
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        response.read()
+        return response.status, response.headers
+
+def run_load(port, plan, route, count, concurrency):
+    workers = min(concurrency, count)
+    clients = [HttpClient(port, plan.users[i % len(plan.users)]) for i in range(workers)]
+    counter = itertools.count()
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def work(client):
+        while next(counter) < count:
+            method, path, form = plan.next(route, client.user)
+            request_started = time.perf_counter()
+            status, _ = client.request(method, path, form)
+            elapsed = time.perf_counter() - request_started
+            with lock:
+                latencies.append(elapsed)
+                errors[0] += is_error(route, status)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(work, clients))
+    return summarize(latencies, errors[0], time.perf_counter() - started)
+
+def start_server(flask_app):
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, flask_app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def result_key(result):
+    return (result['mode'], result['route'], result['catalog_size'], result['watchlist_size'])
+
+# Compare against a baseline: a scenario regresses if its p95 latency grew, or its
+# throughput shrank, by more than the threshold, or if it failed more requests
+def compare(results, baseline, threshold):
+    previous = {result_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        base = previous.get(result_key(result))
+        if base is None:
+            continue
+        if result['errors'] > base.get('errors', 0):
+            regressions.append(f"{result_key(result)}: errors {base.get('errors', 0)} -> {result['errors']}")
+        if base.get('p95_ms') and result['p95_ms'] and result['p95_ms'] > base['p95_ms'] * (1 + threshold):
+            regressions.append(f"{result_key(result)}: p95 {base['p95_ms']}ms -> {result['p95_ms']}ms")
+        if base.get('throughput_rps') and result['throughput_rps'] and result['throughput_rps'] < base['throughput_rps'] * (1 - threshold):
+            regressions.append(f"{result_key(result)}: throughput {base['throughput_rps']}/s -> {result['throughput_rps']}/s")
+    return regressions
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+    results = []
+    with tempfile.TemporaryDirectory(prefix='main-project-bench-') as workdir:
+        app_module, flask_app = import_app(workdir, args)
+        server = start_server(flask_app) if args.mode in ('load', 'both') else None
+        modes = ['inprocess', 'load'] if args.mode == 'both' else [args.mode]
+        try:
+            for catalog_size in args.catalog_sizes:
+                for watchlist_size in args.watchlist_sizes:
+                    users = seed(app_module, flask_app, catalog_size, watchlist_size, args.users, rng)
+                    plan = RequestPlan(catalog_size, users, rng)
+                    for mode in modes:
+                        for route in args.routes:
+                            if mode == 'inprocess':
+                                stats = run_inprocess(flask_app, plan, route, args.requests)
+                            else:
+                                stats = run_load(server.server_port, plan, route, args.requests, args.concurrency)
+                            result = dict(mode=mode, route=route, catalog_size=catalog_size, watchlist_size=watchlist_size, **stats)
+                            results.append(result)
+                            print(f"{mode:9} {route:22} catalog={catalog_size:<8} watchlist={watchlist_size:<6} "
+                                  f"{result['throughput_rps']:>9} req/s  p50={result['p50_ms']}ms  "
+                                  f"p95={result['p95_ms']}ms  p99={result['p99_ms']}ms  errors={result['errors']}")
+        finally:
+            if server is not None:
+                server.shutdown()
+
+    report = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'users': args.users,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f'Wrote {len(results)} results to {args.output}')
+
+    # A route that starts failing fast would otherwise look like a speed-up
+    failed = [result for result in results if result['errors']]
+    if failed:
+        print(f'{len(failed)} scenario(s) had failed requests:')
+        for result in failed:
+            print(f"  {result_key(result)}: {result['errors']} of {result['requests']}")
+        return 1
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        if regressions:
+            print(f'{len(regressions)} regression(s) beyond {args.threshold:.0%}:')
+            for regression in regressions:
+                print('  ' + regression)
+            return 1
+        print(f'No regressions beyond {args.threshold:.0%} against {args.baseline}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
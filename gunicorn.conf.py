@@ -0,0 +1,14 @@
+import os
+
+# Serving under gunicorn, after creating the tables with `flask --app app init-db`:
+#
+#     gunicorn
+#
+# The app is created once in the master, where create_app() loads the catalog and
+# compiles the templates, and the workers are forked from it already warm, sharing
+# that memory copy-on-write.
+wsgi_app = 'app:create_app()'
+bind = os.environ.get('BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+preload_app = True
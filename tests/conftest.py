@@ -0,0 +1,44 @@
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db, load_catalog, User, user_cache, preferences_cache
+
+# An app on a scratch database, with the built-in catalog loaded. Everything the app
+# would write (audit log, poster cache, profiles) goes under tmp_path too.
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "test.db"}',
+        'TEMPLATE_MODE': 'memory',
+        'TEMPLATE_BYTECODE_CACHE_DIR': None,
+        'PASSWORD_HASH_WORKERS': 0,
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+        'AUDIT_LOG_PATH': str(tmp_path / 'audit.log'),
+        'POSTER_CACHE_DIR': str(tmp_path / 'posters'),
+        'PROFILE_DIR': str(tmp_path / 'profiles'),
+    })
+    with app.app_context():
+        db.create_all()
+        load_catalog()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    user_cache._items.clear()
+    preferences_cache._items.clear()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+# A client logged in as a fresh user
+@pytest.fixture
+def user_client(app, client):
+    with app.app_context():
+        db.session.add(User(username='alice', password=generate_password_hash('secret', 'pbkdf2:sha256:1000')))
+        db.session.commit()
+    response = client.post('/login', data={'username': 'alice', 'password': 'secret'})
+    assert response.status_code == 302
+    return client
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from app import db, Show, InvalidShow, validate_show
+
+def run_import(app, path, *args):
+    result = app.test_cli_runner().invoke(args=['import-catalog', str(path), *args])
+    assert result.exception is None, result.output
+    return result
+
+def imported_shows(app):
+    with app.app_context():
+        return {show.id: show.title for show in db.session.query(Show)}
+
+def test_import_jsonl_skips_bad_records(app, tmp_path):
+    path = tmp_path / 'shows.jsonl'
+    lines = [
+        json.dumps({'id': 101, 'title': 'Good'}),
+        '[1, 2]',
+        '"just a string"',
+        'not json',
+        json.dumps({'id': 1.7, 'title': 'Fractional id'}),
+        json.dumps({'id': 102}),
+        json.dumps({'id': 103.0, 'title': 'Integral float id'}),
+    ]
+    path.write_text('\n'.join(lines) + '\n')
+
+    result = run_import(app, path)
+
+    assert 'Imported 2 shows (5 skipped).' in result.output
+    shows = imported_shows(app)
+    assert shows[101] == 'Good'
+    assert shows[103] == 'Integral float id'
+    assert 1 not in shows or shows[1] != 'Fractional id'
+    assert 102 not in shows
+
+def test_import_csv_upserts(app, tmp_path):
+    path = tmp_path / 'shows.csv'
+    path.write_text('id,title,genre\n1,Renamed,Anime\n200,New show,Drama\n')
+
+    run_import(app, path)
+    run_import(app, path)
+
+    shows = imported_shows(app)
+    assert shows[1] == 'Renamed'
+    assert shows[200] == 'New show'
+
+@pytest.mark.parametrize('record', [
+    [1, 2],
+    'show',
+    {'id': 1.7, 'title': 'x'},
+    {'id': '1.7', 'title': 'x'},
+    {'id': True, 'title': 'x'},
+    {'id': 0, 'title': 'x'},
+    {'id': 2 ** 63, 'title': 'x'},
+    {'id': 5},
+])
+def test_validate_show_rejects(record):
+    with pytest.raises(InvalidShow):
+        validate_show(record)
+
+def test_validate_show_normalises_fields():
+    show = validate_show({'id': ' 7 ', 'title': ' Title ', 'genre': '', 'rating': 9})
+    assert show['id'] == 7
+    assert show['title'] == 'Title'
+    assert show['genre'] is None
+    assert show['rating'] == '9'
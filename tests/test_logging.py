@@ -0,0 +1,17 @@
+import logging
+
+from app import create_app, BackgroundQueueHandler
+
+def test_create_app_replaces_and_stops_the_previous_log_listener(app):
+    logging.getLogger('test').warning('start the listener')
+    old = [handler for handler in logging.getLogger().handlers if isinstance(handler, BackgroundQueueHandler)]
+    assert len(old) == 1 and old[0]._started
+
+    create_app({'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI'], 'TEMPLATE_MODE': 'memory',
+                'TEMPLATE_BYTECODE_CACHE_DIR': None, 'AUDIT_LOG_PATH': app.config['AUDIT_LOG_PATH']})
+    logging.getLogger('test').warning('start the new listener')
+
+    handlers = [handler for handler in logging.getLogger().handlers if isinstance(handler, BackgroundQueueHandler)]
+    assert len(handlers) == 1 and handlers[0] is not old[0]
+    assert not old[0]._started
+    assert not old[0]._listener._thread
@@ -0,0 +1,18 @@
+import pytest
+
+from app import swipe_buffer, SwipeEvent, db
+
+def test_swipe_is_buffered_and_flushed(app, user_client):
+    assert user_client.post('/swipe', json={'show_id': 1, 'liked': True}).status_code == 202
+    assert user_client.post('/swipe', data={'show_id': '2', 'liked': 'false'}).status_code == 202
+    swipe_buffer.flush()
+    with app.app_context():
+        swipes = {(event.show_id, event.liked) for event in db.session.query(SwipeEvent)}
+    assert swipes == {(1, True), (2, False)}
+
+@pytest.mark.parametrize('body', [[1], 'x', 3, None])
+def test_swipe_rejects_non_object_json(user_client, body):
+    assert user_client.post('/swipe', json=body).status_code == 400
+
+def test_swipe_unknown_show(user_client):
+    assert user_client.post('/swipe', json={'show_id': 9999, 'liked': True}).status_code == 404
@@ -0,0 +1,83 @@
+import pytest
+
+from app import db, WatchlistEntry, UserVersion, SwipeEvent, swipe_buffer
+
+def batch(client, *operations):
+    response = client.post('/watchlist/batch', json={'operations': [
+        {'op': op, 'show_id': show_id} for op, show_id in operations]})
+    assert response.status_code == 200
+    return [result['ok'] for result in response.get_json()['results']]
+
+def watchlist_ids(app):
+    with app.app_context():
+        stmt = db.select(WatchlistEntry.show_id).order_by(WatchlistEntry.added_at, WatchlistEntry.show_id)
+        return list(db.session.scalars(stmt))
+
+def user_version(app):
+    with app.app_context():
+        row = db.session.get(UserVersion, 1)
+        return row.version if row else 0
+
+def test_adds_and_removes_in_one_request(app, user_client):
+    assert batch(user_client, ('add', 1), ('add', 2), ('add', 3)) == [True, True, True]
+    assert batch(user_client, ('remove', 2), ('add', 4)) == [True, True]
+    assert watchlist_ids(app) == [1, 3, 4]
+
+def test_add_then_remove_then_add_nets_to_one_add(app, user_client):
+    assert batch(user_client, ('add', 1), ('remove', 1), ('add', 1)) == [True, True, True]
+    assert watchlist_ids(app) == [1]
+
+def test_add_then_remove_is_no_change(app, user_client):
+    version = user_version(app)
+    assert batch(user_client, ('add', 1), ('remove', 1)) == [True, True]
+    assert watchlist_ids(app) == []
+    assert user_version(app) == version
+
+def test_remove_before_add_of_existing_show(app, user_client):
+    batch(user_client, ('add', 1))
+    assert batch(user_client, ('remove', 1), ('add', 1)) == [True, True]
+    assert watchlist_ids(app) == [1]
+
+def test_remove_of_missing_show_and_duplicate_add_fail(app, user_client):
+    assert batch(user_client, ('remove', 2), ('add', 1), ('add', 1)) == [False, True, False]
+    assert watchlist_ids(app) == [1]
+
+def test_changes_bump_the_user_version(app, user_client):
+    version = user_version(app)
+    batch(user_client, ('add', 1))
+    assert user_version(app) == version + 1
+
+def test_invalid_operations_fail_individually(app, user_client):
+    response = user_client.post('/watchlist/batch', json={'operations': [
+        {'op': 'add', 'show_id': 2 ** 64},
+        {'op': 'remove', 'show_id': 2 ** 64},
+        {'op': 'add', 'show_id': 'abc'},
+        {'op': 'explode', 'show_id': 1},
+        [1],
+        {'op': 'add', 'show_id': 9999},
+        {'op': 'add', 'show_id': 1},
+    ]})
+    assert response.status_code == 200
+    assert [result['ok'] for result in response.get_json()['results']] == [False] * 6 + [True]
+    assert watchlist_ids(app) == [1]
+
+@pytest.mark.parametrize('body', [[1], 'x', {'operations': 'add'}, {'operations': [{'op': 'add', 'show_id': 1}] * 201}])
+def test_malformed_body_is_a_400(user_client, body):
+    assert user_client.post('/watchlist/batch', json=body).status_code == 400
+
+def test_requires_login(client):
+    assert client.post('/watchlist/batch', json={'operations': []}).status_code == 302
+
+def test_swipes_ride_along_with_watchlist_operations(app, user_client):
+    response = user_client.post('/watchlist/batch', json={'operations': [
+        {'op': 'swipe', 'show_id': 1, 'liked': True},
+        {'op': 'add', 'show_id': 1},
+        {'op': 'swipe', 'show_id': 2, 'liked': False},
+        {'op': 'swipe', 'show_id': 9999, 'liked': True},
+    ]})
+    assert [result['ok'] for result in response.get_json()['results']] == [True, True, True, False]
+    swipe_buffer.flush()
+    with app.app_context():
+        swipes = {(event.show_id, event.liked) for event in db.session.query(SwipeEvent)}
+    assert swipes == {(1, True), (2, False)}
+    assert watchlist_ids(app) == [1]
@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import pytest
+
+from app import (db, load_catalog, upsert_shows, add_watchlist_entries,
+                 encode_watchlist_cursor, decode_watchlist_cursor)
+
+@pytest.fixture
+def watchlist(app, user_client):
+    show_ids = list(range(100, 130))
+    with app.app_context():
+        upsert_shows([{'id': show_id, 'title': f'Show {show_id}', 'genre': 'Drama', 'image_url': None,
+                       'rating': '5/10', 'description': None} for show_id in show_ids])
+        db.session.commit()
+        load_catalog()
+        # One at a time, so they're added in this order
+        for show_id in show_ids:
+            add_watchlist_entries(1, [show_id])
+            db.session.commit()
+    return show_ids
+
+def fetch_all(client, limit, on_page=None):
+    seen, cursor = [], None
+    while True:
+        params = {'limit': limit, **({'after': cursor} if cursor else {})}
+        response = client.get('/api/watchlist', query_string=params)
+        assert response.status_code == 200
+        page = response.get_json()
+        seen += [show['id'] for show in page['shows']]
+        if on_page:
+            on_page(seen)
+        cursor = page['next']
+        if cursor is None:
+            return seen
+
+def test_pages_cover_the_watchlist_in_order(user_client, watchlist):
+    assert fetch_all(user_client, 7) == watchlist
+
+def test_removing_seen_items_does_not_shift_pages(user_client, watchlist):
+    def remove_first_seen(seen):
+        if len(seen) == 7:
+            user_client.post(f'/remove-from-watchlist/{seen[0]}')
+    assert fetch_all(user_client, 7, remove_first_seen) == watchlist
+
+def test_first_page_of_watchlist_view_links_to_the_rest(user_client, watchlist):
+    html = user_client.get('/watchlist').get_data(as_text=True)
+    assert 'id="watchlist-item-100"' in html
+
+def test_cursor_round_trip():
+    added_at = datetime(2026, 1, 2, 3, 4, 5, 678901)
+    assert decode_watchlist_cursor(encode_watchlist_cursor(added_at, 42)) == (added_at, 42)
+
+@pytest.mark.parametrize('cursor', [
+    'garbage',
+    '20260101000000000000',
+    '20260101000000000000.abc',
+    '20260101000000000000.0',
+    '20260101000000000000.-5',
+    '20260101000000000000.99999999999999999999',
+])
+def test_invalid_cursor_is_a_400(user_client, cursor):
+    response = user_client.get('/api/watchlist', query_string={'after': cursor})
+    assert response.status_code == 400